@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from app.db.analytics import category_stats, marketplace_stats
+from app.db.conditional import Validators
+from app.db.deps import get_db
+from app.db.schemas import AnalyticsStatsSchema, CategoryStatsListSchema, CategoryStatsSchema
+
+
+analytics_router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+async def _validators(db: AsyncSession) -> Tuple[datetime, Validators]:
+    # витрины меняются только при обновлении - ETag и Last-Modified по его времени
+    refreshed_at = await db.scalar(select(marketplace_stats.c.refreshed_at))
+    if refreshed_at is None:
+        raise HTTPException(status_code=503, detail="Analytics are not refreshed yet")
+    return refreshed_at, Validators.from_state(refreshed_at, last_modified=refreshed_at)
+
+
+@analytics_router.get("/marketplace", response_model=AnalyticsStatsSchema)
+async def marketplace_analytics(request: Request, response: Response,
+                                db: AsyncSession = Depends(get_db)):
+    _, validators = await _validators(db)
+    if validators.matches(request):
+        return validators.not_modified()
+    row = (await db.execute(select(marketplace_stats))).mappings().first()
+    return validators.apply(row, response)
+
+
+@analytics_router.get("/categories", response_model=CategoryStatsListSchema)
+async def category_analytics(request: Request, response: Response,
+                             db: AsyncSession = Depends(get_db)):
+    refreshed_at, validators = await _validators(db)
+    if validators.matches(request):
+        return validators.not_modified()
+    rows = (await db.execute(select(category_stats)
+                             .order_by(category_stats.c.category_id))).mappings().all()
+    return validators.apply({"refreshed_at": refreshed_at, "items": rows}, response)
+
+
+@analytics_router.get("/categories/{category_id}", response_model=CategoryStatsSchema)
+async def category_analytics_detail(category_id: int, request: Request, response: Response,
+                                    db: AsyncSession = Depends(get_db)):
+    _, validators = await _validators(db)
+    if validators.matches(request):
+        return validators.not_modified()
+    row = (await db.execute(select(category_stats)
+                            .where(category_stats.c.category_id == category_id))
+           ).mappings().first()
+    if row is None:
+        # новая категория появится в витрине после следующего обновления
+        raise HTTPException(status_code=404, detail="Category not found")
+    return validators.apply(row, response)
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from app.db.deps import get_db
+from app.db.models import UserProfile
+from app.db.schemas import LoginSchema, TokenSchema, UserProfileOutSchema
+from app.services.security import (InvalidToken, create_access_token, hash_password,
+                                   needs_rehash, token_cache, verify_password)
+
+
+auth_router = APIRouter(prefix='/auth', tags=['Auth'])
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def current_user_id(credentials: HTTPAuthorizationCredentials = Depends(_bearer)) -> int:
+    # без обращения к БД и без хеширования: подпись и срок токена,
+    # повторные токены - из token_cache
+    if credentials is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail='Not authenticated',
+                            headers={'WWW-Authenticate': 'Bearer'})
+    try:
+        return token_cache.verify(credentials.credentials)
+    except InvalidToken:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail='Invalid token',
+                            headers={'WWW-Authenticate': 'Bearer'})
+
+
+@auth_router.post('/login', response_model=TokenSchema)
+async def login(credentials: LoginSchema, db: AsyncSession = Depends(get_db)):
+    user_db = await db.scalar(select(UserProfile).where(UserProfile.email == credentials.email))
+    if not await verify_password(credentials.password,
+                                 user_db.password if user_db else None):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail='Invalid email or password')
+    # открытый пароль из старых записей или хеш с прежней стоимостью
+    if needs_rehash(user_db.password):
+        user_db.password = await hash_password(credentials.password)
+        await db.commit()
+    token, expires_at = create_access_token(user_db.id)
+    return {'access_token': token, 'expires_at': expires_at}
+
+
+@auth_router.get('/me', response_model=UserProfileOutSchema)
+async def me(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_db)):
+    user_db = await db.scalar(select(UserProfile).where(UserProfile.id == user_id))
+    if not user_db:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='User not found')
+    return user_db
@@ -1,68 +1,92 @@
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-from app.db.database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
+from sqlalchemy.orm.attributes import set_committed_value
+from fastapi import APIRouter, HTTPException, Depends, Request
+from app.db.conditional import cached_json_response
+from app.db.crud import delete_returning, update_returning
+from app.db.deps import get_db, get_primary_db
 from app.db.schemas import (CategoryOutSchema, CategoryCreateSchema,
-                            CategoryDetailSchema, CategoryUpdateSchema)
-from app.db.schemas import Category
+                            CategoryDetailSchema, CategoryUpdateSchema,
+                            PageSchema)
+from app.db.models import Category, Project, Review
+from app.db.pagination import PageParams, paginate
+from app.services.cache import catalog_cache
+from app.services.ranking import freelancer_index
+from app.services.ratings import subtract_reviews
 
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+category_router = APIRouter(prefix="/category", tags=["Categories"])
 
+CATEGORY_DETAIL_OPTIONS = (raiseload('*'),)
+# В карточке (и в кеше) только последние проекты категории, полный список
+# постранично - GET /project/?category_id=
+CATEGORY_DETAIL_PROJECTS = 20
 
-category_router = APIRouter(prefix="/category", tags=["Categories"])
 
+@category_router.get("/", response_model=PageSchema[CategoryOutSchema])
+async def list_categories(request: Request, page: PageParams = Depends(),
+                          db: AsyncSession = Depends(get_primary_db)):
+    async def load():
+        categories = await paginate(db, select(Category), (Category.id,), page,
+                                    descending=False)
+        return PageSchema[CategoryOutSchema].model_validate(categories).model_dump(mode='json')
 
-@category_router.get("/", response_model=List[CategoryOutSchema])
-async def list_categories(
-                          db: Session = Depends(get_db)):
-    category_db = db.query(Category).all()
-    return category_db
+    raw = await catalog_cache.get_or_load_raw(f"category:list:{page.cache_key()}", load)
+    return cached_json_response(request, raw)
 
 
 @category_router.post("/", response_model=CategoryOutSchema)
 async def create_categories(category_data: CategoryCreateSchema,
-                            db: Session = Depends(get_db)):
+                            db: AsyncSession = Depends(get_db)):
     new_category= Category(category_name=category_data.category_name)
     db.add(new_category)
-    db.commit()
-    db.refresh(new_category)
+    await db.commit()
+    await db.refresh(new_category)
+    await catalog_cache.invalidate("category:")
     return new_category
 
 
 @category_router.get("/{category_id}", response_model=CategoryDetailSchema)
-async def detail_categories(category_id: int, db:
-                            Session = Depends(get_db)):
-    category_db = db.query(Category).filter(Category.id == category_id).first()
-    if not category_db:
+async def detail_categories(category_id: int, request: Request,
+                            db: AsyncSession = Depends(get_primary_db)):
+    async def load():
+        category_db = await db.scalar(select(Category).where(Category.id == category_id)
+                                      .options(*CATEGORY_DETAIL_OPTIONS))
+        if not category_db:
+            return None
+        projects = (await db.scalars(
+            select(Project).where(Project.category_id == category_id)
+            .order_by(Project.created_at.desc(), Project.id.desc())
+            .limit(CATEGORY_DETAIL_PROJECTS).options(raiseload('*')))).all()
+        set_committed_value(category_db, 'projects', projects)
+        return CategoryDetailSchema.model_validate(category_db).model_dump(mode='json')
+
+    # проекты категории входят в ответ, их изменения сбрасывают этот ключ
+    raw = await catalog_cache.get_or_load_raw(f"category:detail:{category_id}", load)
+    if raw == 'null':
         raise HTTPException(status_code=404, detail="Category not found")
-    return category_db
+    return cached_json_response(request, raw)
 
 
 @category_router.put("/{category_id}", response_model=CategoryOutSchema)
 async def update_categories(category_id: int, category_data: CategoryUpdateSchema,
-                            db: Session = Depends(get_db)):
-    category_db = db.query(Category).filter(Category.id == category_id).first()
-    if not category_db:
-        raise HTTPException(status_code=404, detail="Category not found")
-    #обновление значения поля существующего объекта SQLAlchemy (category_db)
-    # новым значением, полученным из Pydantic-схемы (category_data).
-    category_db.category_name = category_data.category_name
-    db.commit()
-    db.refresh(category_db)
+                            db: AsyncSession = Depends(get_db)):
+    category_db = await update_returning(db, Category, category_id,
+                                         category_data.dict(exclude_unset=True),
+                                         "Category not found")
+    await db.commit()
+    await catalog_cache.invalidate("category:")
     return category_db
 
 
 @category_router.delete("/{category_id}")
-async def delete_categories(category_id: int, db: Session = Depends(get_db)):
-    category_db = db.query(Category).filter(Category.id == category_id).first()
-    if not category_db:
-        raise HTTPException(status_code=404, detail="Category not found")
-    db.delete(category_db)
-    db.commit()
+async def delete_categories(category_id: int, db: AsyncSession = Depends(get_db)):
+    # проекты категории и всё, что к ним относится, удаляет ON DELETE CASCADE
+    ratings = await subtract_reviews(db, Review.project_id.in_(
+        select(Project.id).where(Project.category_id == category_id)))
+    await delete_returning(db, Category, category_id, "Category not found")
+    await db.commit()
+    freelancer_index.ratings_replaced(ratings)
+    await catalog_cache.invalidate("category:")
     return {"message": "Category deleted"}
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum as PyEnum
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import select
+from starlette.responses import StreamingResponse
+from app.db.filters import OfferFilter, ProjectFilter, ReviewFilter
+from app.db.models import Offer, Project, Review
+from app.db.replicas import replica_router
+from app.db.schemas import OfferOutSchema, ProjectOutSchema, ReviewOutSchema
+
+
+export_router = APIRouter(prefix="/export", tags=["Export"])
+
+EXPORT_BATCH = 1000
+
+
+class ExportFormat(str, PyEnum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def _plain(value):
+    # то же представление, что и в JSON-ответах API
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, PyEnum):
+        return value.value
+    return value
+
+
+def _export_columns(model, schema) -> list:
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+async def _partitions(request: Request, stmt):
+    # Своя сессия, а не Depends(get_db): она должна жить, пока отдаётся тело ответа.
+    # yield_per включает серверный курсор - в памяти только одна пачка строк.
+    # Выгрузки - самое тяжёлое чтение, при наличии реплик идут на них
+    async with await replica_router.open_session(request) as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def _ndjson(request: Request, stmt, names):
+    async for rows in _partitions(request, stmt):
+        yield ''.join(json.dumps(dict(zip(names, map(_plain, row)))) + '\n'
+                      for row in rows)
+
+
+async def _csv(request: Request, stmt, names):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    async for rows in _partitions(request, stmt):
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # заголовок пустой выгрузки
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _export(request: Request, model, schema, conditions, export_format: ExportFormat,
+            name: str):
+    columns = _export_columns(model, schema)
+    names = [column.key for column in columns]
+    stmt = select(*columns).where(*conditions).order_by(model.id)
+    if export_format == ExportFormat.csv:
+        body, media_type = _csv(request, stmt, names), "text/csv"
+    else:
+        body, media_type = _ndjson(request, stmt, names), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'})
+
+
+@export_router.get("/projects")
+async def export_projects(request: Request, filters: ProjectFilter = Depends(),
+                          export_format: ExportFormat = Query(ExportFormat.ndjson,
+                                                              alias="format")):
+    return _export(request, Project, ProjectOutSchema, filters.conditions(),
+                   export_format, "projects")
+
+
+@export_router.get("/offers")
+async def export_offers(request: Request, filters: OfferFilter = Depends(),
+                        export_format: ExportFormat = Query(ExportFormat.ndjson,
+                                                            alias="format")):
+    return _export(request, Offer, OfferOutSchema, filters.conditions(),
+                   export_format, "offers")
+
+
+@export_router.get("/reviews")
+async def export_reviews(request: Request, filters: ReviewFilter = Depends(),
+                         export_format: ExportFormat = Query(ExportFormat.ndjson,
+                                                            alias="format")):
+    return _export(request, Review, ReviewOutSchema, filters.conditions(),
+                   export_format, "reviews")
@@ -1,41 +1,64 @@
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Body, HTTPException, Depends, Request
 from typing import List
-from app.db.database import SessionLocal
+from app.db.bulk import (BULK_MAX_ITEMS, bulk_create, missing_refs,
+                         reject_missing, validate_items)
+from app.db.conditional import touch_projects
+from app.db.crud import delete_returning, update_returning
+from app.db.deps import get_db
+from app.db.filters import OfferFilter
+from app.db.pagination import PageParams, paginate
+from app.db.serialization import page_response
 from app.db.schemas import (OfferOutSchema, OfferCreateSchema,
-                            OfferUpdateSchema, OfferDetailSchema)
-from app.db.models import Offer
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+                            OfferUpdateSchema, OfferDetailSchema,
+                            PageSchema, BulkCreateResultSchema)
+from app.db.models import Offer, Project, UserProfile
+from app.services.ranking import freelancer_index
 
 
 offer_router = APIRouter(prefix="/offers", tags=["Offers"])
 
 
-@offer_router.get("/", response_model=List[OfferOutSchema])
-async def list_offers(db: Session = Depends(get_db)):
-    offers = db.query(Offer).all()
-    return offers
+@offer_router.get("/", response_model=PageSchema[OfferOutSchema])
+async def list_offers(request: Request,
+                      filters: OfferFilter = Depends(),
+                      page: PageParams = Depends(),
+                      db: AsyncSession = Depends(get_db)):
+    stmt = select(Offer).where(*filters.conditions())
+    return await page_response(request, OfferOutSchema,
+                               await paginate(db, stmt, (Offer.created_at, Offer.id), page))
 
 
 @offer_router.post("/", response_model=OfferOutSchema)
 async def create_offer(offer_create: OfferCreateSchema,
-                       db: Session = Depends(get_db)):
+                       db: AsyncSession = Depends(get_db)):
     offer = Offer(**offer_create.dict())
     db.add(offer)
-    db.commit()
-    db.refresh(offer)
+    await db.commit()
+    await db.refresh(offer)
+    freelancer_index.offers_created([offer.freelancer_id])
+    return offer
+
+
+@offer_router.post("/bulk", response_model=BulkCreateResultSchema)
+async def bulk_create_offer(items: List[dict] = Body(max_length=BULK_MAX_ITEMS),
+                            db: AsyncSession = Depends(get_db)):
+    valid, errors = validate_items(OfferCreateSchema, items)
+    missing = await missing_refs(db, Project.id, (item.project_id for _, item in valid))
+    valid = reject_missing(valid, errors, 'project_id', missing)
+    missing = await missing_refs(db, UserProfile.id, (item.freelancer_id for _, item in valid))
+    valid = reject_missing(valid, errors, 'freelancer_id', missing)
+    result = await bulk_create(db, Offer, valid, errors)
+    created = {row["index"] for row in result["created"]}
+    freelancer_index.offers_created(item.freelancer_id for index, item in valid
+                                    if index in created)
+    return result
 
 
 @offer_router.get("/{offer_id}", response_model=OfferDetailSchema)
-async def detail_offer(offer_id: int, db: Session = Depends(get_db)):
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
+async def detail_offer(offer_id: int, db: AsyncSession = Depends(get_db)):
+    offer = await db.scalar(select(Offer).where(Offer.id == offer_id))
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
     return offer
@@ -43,22 +66,16 @@ async def detail_offer(offer_id: int, db: Session = Depends(get_db)):
 
 @offer_router.put("/{offer_id}", response_model=OfferOutSchema)
 async def update_offer(offer_id: int, offer_data: OfferUpdateSchema,
-                       db: Session = Depends(get_db)):
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    if not offer:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    for key, value in offer_data.dict().items():
-        setattr(offer, key, value)
-    db.commit()
-    db.refresh(offer)
+                       db: AsyncSession = Depends(get_db)):
+    offer = await update_returning(db, Offer, offer_id, offer_data.dict(exclude_unset=True),
+                                   "Offer not found")
+    await db.commit()
     return offer
 
 
 @offer_router.delete("/{offer_id}")
-async def delete_offer(offer_id: int, db: Session = Depends(get_db)):
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    if not offer:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    db.delete(offer)
-    db.commit()
-    return {"message": "Offer deleted"}
\ No newline at end of file
+async def delete_offer(offer_id: int, db: AsyncSession = Depends(get_db)):
+    offer = await delete_returning(db, Offer, offer_id, "Offer not found", Offer.project_id)
+    await db.execute(touch_projects([offer.project_id]))
+    await db.commit()
+    return {"message": "Offer deleted"}
@@ -1,69 +1,168 @@
-from sqlalchemy.orm import Session
-from fastapi import Depends, HTTPException, APIRouter
-from typing import List
-from app.db.database import SessionLocal
-from app.db.schemas import (ProjectOutSchema, ProjectCreateSchema,
-                            ProjectUpdateSchema, ProjectDetailSchema)
-from app.db.models import Project
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Body, Depends, HTTPException, APIRouter, Query, Request, Response
+from typing import List, Optional
+from app.db.bulk import (BULK_MAX_ITEMS, bulk_create, missing_refs,
+                         reject_missing, validate_items)
+from app.db.conditional import page_validators, project_validators
+from app.db.crud import delete_returning, update_returning
+from app.db.deps import get_db, get_primary_db
+from app.db.filters import ProjectFilter
+from app.db.loaders import load_project_detail
+from app.db.offer_stats import attach_offer_stats
+from app.db.pagination import PageParams, keyset_select, paginate
+from app.db.serialization import page_response
+from app.db.search import search_projects, skill_condition
+from app.db.schemas import (ProjectOutSchema, ProjectCreateSchema, ProjectListSchema,
+                            ProjectUpdateSchema, ProjectDetailSchema,
+                            PageSchema, ProjectBulkStatusSchema, ProjectSearchSchema,
+                            BulkCreateResultSchema, BulkUpdateResultSchema,
+                            FreelancerRankSchema, OfferOutSchema)
+from app.db.models import Category, Offer, Project, Review, UserProfile, skill_project
+from app.services.cache import catalog_cache, invalidate_category_details
+from app.services.ranking import freelancer_index
+from app.services.ratings import subtract_reviews
 
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+project_router = APIRouter(prefix="/project", tags=["Projects"])
 
 
-project_router = APIRouter(prefix="/project", tags=["Projects"])
+@project_router.get("/", response_model=PageSchema[ProjectListSchema])
+async def list_project(request: Request, response: Response,
+                       filters: ProjectFilter = Depends(),
+                       page: PageParams = Depends(),
+                       db: AsyncSession = Depends(get_db)):
+    stmt = select(Project).where(*filters.conditions())
+    keys, descending = filters.sort_keys()
+    # total зависит от строк вне страницы - с ним ответ не валидируется
+    validators = None if page.total else \
+        await page_validators(db, keyset_select(db, stmt, keys, page, descending))
+    if validators and validators.matches(request):
+        return validators.not_modified()
+    projects = await paginate(db, stmt, keys, page, descending=descending)
+    await attach_offer_stats(db, projects["items"])
+    result = await page_response(request, ProjectListSchema, projects)
+    return validators.apply(result, response) if validators else result
 
 
-@project_router.get("/", response_model=List[ProjectOutSchema])
-async def list_project(db: Session = Depends(get_db)):
-    project_db = db.query(Project).all()
-    return project_db
+@project_router.get("/search", response_model=PageSchema[ProjectSearchSchema])
+async def search_project(q: str = Query(min_length=1, max_length=200),
+                         skill_id: Optional[int] = Query(None, gt=0),
+                         filters: ProjectFilter = Depends(),
+                         page: PageParams = Depends(),
+                         db: AsyncSession = Depends(get_db)):
+    conditions = filters.conditions()
+    if skill_id is not None:
+        conditions.append(skill_condition(skill_id))
+    return await search_projects(db, q, conditions, page)
 
 
 @project_router.post("/", response_model=ProjectOutSchema)
 async def create_project(project_data: ProjectCreateSchema,
-                         db: Session = Depends(get_db)):
+                         db: AsyncSession = Depends(get_db)):
     new_project = Project(**project_data.dict())
     db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
+    await db.commit()
+    await db.refresh(new_project)
+    await invalidate_category_details(new_project.category_id)
     return new_project
 
 
+@project_router.post("/bulk", response_model=BulkCreateResultSchema)
+async def bulk_create_project(items: List[dict] = Body(max_length=BULK_MAX_ITEMS),
+                              db: AsyncSession = Depends(get_db)):
+    valid, errors = validate_items(ProjectCreateSchema, items)
+    missing = await missing_refs(db, Category.id, (item.category_id for _, item in valid))
+    valid = reject_missing(valid, errors, 'category_id', missing)
+    missing = await missing_refs(db, UserProfile.id, (item.client_id for _, item in valid))
+    valid = reject_missing(valid, errors, 'client_id', missing)
+    result = await bulk_create(db, Project, valid, errors)
+    await invalidate_category_details(*(item.category_id for _, item in valid))
+    return result
+
+
+@project_router.patch("/bulk/status", response_model=BulkUpdateResultSchema)
+async def bulk_update_project_status(status_data: ProjectBulkStatusSchema,
+                                     db: AsyncSession = Depends(get_db)):
+    # один UPDATE ... WHERE id IN (...) RETURNING id вместо цикла по проектам
+    result = await db.execute(
+        update(Project).where(Project.id.in_(status_data.ids))
+        .values(status=status_data.status).returning(Project.id, Project.category_id)
+        .execution_options(synchronize_session=False))
+    rows = result.all()
+    await db.commit()
+    await invalidate_category_details(*(row.category_id for row in rows))
+    updated = sorted(row.id for row in rows)
+    return {"updated": updated,
+            "not_found": sorted(set(status_data.ids) - set(updated))}
+
+
 @project_router.get("/{project_id}", response_model=ProjectDetailSchema)
-async def detail_project(project_id: int, db: Session
-                                        = Depends(get_db)):
-    project_db = db.query(Project).filter(Project.id == project_id).first()
+async def detail_project(project_id: int, request: Request, response: Response,
+                         db: AsyncSession = Depends(get_db)):
+    # валидатор - один запрос без ORM; при совпадении запросы карточки не нужны
+    validators = await project_validators(db, project_id)
+    if validators is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if validators.matches(request):
+        return validators.not_modified()
+    project_db = await load_project_detail(db, project_id)
     if not project_db:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project_db
+    return validators.apply(project_db, response)
+
+
+@project_router.get("/{project_id}/offers", response_model=PageSchema[OfferOutSchema])
+async def list_project_offers(request: Request, project_id: int,
+                              page: PageParams = Depends(),
+                              db: AsyncSession = Depends(get_db)):
+    # по индексу ix_offers_project_created_at_id, без чтения самого проекта
+    offers = await paginate(db, select(Offer).where(Offer.project_id == project_id),
+                            (Offer.created_at, Offer.id), page)
+    # пустая первая страница - единственный случай, когда нужно отличить
+    # проект без предложений от несуществующего
+    if not offers["items"] and not page.cursor and \
+            await db.scalar(select(Project.id).where(Project.id == project_id)) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return await page_response(request, OfferOutSchema, offers)
+
+
+@project_router.get("/{project_id}/freelancers", response_model=List[FreelancerRankSchema])
+async def rank_freelancers(project_id: int, limit: int = Query(10, ge=1, le=100),
+                           db: AsyncSession = Depends(get_primary_db)):
+    rows = (await db.execute(
+        select(Project.client_id, skill_project.c.skill_id)
+        .outerjoin(skill_project, skill_project.c.project_id == Project.id)
+        .where(Project.id == project_id))).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Project not found")
+    await freelancer_index.ensure_built(db)
+    return freelancer_index.top([row.skill_id for row in rows if row.skill_id], limit,
+                                exclude=[rows[0].client_id])
 
 
 @project_router.put("/{project_id}", response_model=ProjectOutSchema)
 async def update_project(project_id: int, project_data: ProjectUpdateSchema,
-                         db: Session = Depends(get_db)):
-    project_db = db.query(Project).filter(Project.id == project_id).first()
-    if not project_db:
-        raise HTTPException(status_code=404, detail="Project not found")
-    #обновить существующую запись к новым значением
-    for key, value in project_data.dict(exclude_unset=True).items():
-        setattr(project_db, key, value)
-    db.commit()
-    db.refresh(project_db)
+                         db: AsyncSession = Depends(get_db)):
+    values = project_data.dict(exclude_unset=True)
+    project_db = await update_returning(db, Project, project_id, values, "Project not found")
+    await db.commit()
+    if 'category_id' in values:
+        # прежняя категория из RETURNING не видна - сбрасываем все карточки категорий
+        await catalog_cache.invalidate("category:detail:")
+    else:
+        await invalidate_category_details(project_db.category_id)
     return project_db
 
 
 @project_router.delete("/{project_id}")
 async def delete_project(project_id: int,
-                         db: Session = Depends(get_db)):
-    project_db = db.query(Project).filter(Project.id == project_id).first()
-    if not project_db:
-        raise HTTPException(status_code=404, detail="Project not found")
-    db.delete(project_db)
-    db.commit()
+                         db: AsyncSession = Depends(get_db)):
+    # предложения, отзывы и связи с навыками удаляет ON DELETE CASCADE
+    ratings = await subtract_reviews(db, Review.project_id == project_id)
+    row = await delete_returning(db, Project, project_id, "Project not found", Project.category_id)
+    await db.commit()
+    freelancer_index.ratings_replaced(ratings)
+    await invalidate_category_details(row.category_id)
     return {"message": "Project deleted"}
 
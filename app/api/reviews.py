@@ -1,67 +1,89 @@
-from sqlalchemy.orm import Session
-from fastapi import Depends, HTTPException, APIRouter
-from typing import List
-from app.db.database import SessionLocal
-from app.db.schemas import ReviewSchema
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, HTTPException, APIRouter, Request
+from app.db.conditional import touch_projects
+from app.db.crud import delete_returning, update_returning
+from app.db.deps import get_db
+from app.db.filters import ReviewFilter
+from app.db.pagination import PageParams, paginate
+from app.db.serialization import page_response
+from app.db.schemas import (ReviewOutSchema, ReviewCreateSchema,
+                            ReviewUpdateSchema, ReviewDetailSchema,
+                            PageSchema)
 from app.db.models import Review
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from app.services.ranking import freelancer_index
+from app.services.ratings import apply_review_change
 
 
 review_router = APIRouter(prefix="/reviews", tags=["Reviews"])
 
 
-@review_router.get('/', response_model=List[ReviewSchema])
-async def list_reviews(db: Session = Depends(get_db)):
-    review_db = db.query(Review).all()
-    return review_db
+@review_router.get('/', response_model=PageSchema[ReviewOutSchema])
+async def list_reviews(request: Request,
+                       filters: ReviewFilter = Depends(),
+                       page: PageParams = Depends(),
+                       db: AsyncSession = Depends(get_db)):
+    stmt = select(Review).where(*filters.conditions())
+    return await page_response(request, ReviewOutSchema,
+                               await paginate(db, stmt, (Review.created_at, Review.id), page))
 
 
-@review_router.post('/', response_model=ReviewSchema)
-async def create_review(review_create: ReviewSchema,
-                        db: Session = Depends(get_db)):
+@review_router.post('/', response_model=ReviewOutSchema)
+async def create_review(review_create: ReviewCreateSchema,
+                        db: AsyncSession = Depends(get_db)):
     new_review = Review(**review_create.dict())
     db.add(new_review)
-    db.commit()
-    db.refresh(new_review)
+    await apply_review_change(db, new_review.target_id, None, new_review.rating, 1)
+    await db.commit()
+    await db.refresh(new_review)
+    if new_review.rating is not None:
+        freelancer_index.rating_changed(new_review.target_id, new_review.rating, 1)
     return new_review
 
 
-@review_router.get('/{review_id}', response_model=ReviewSchema)
-async def detail_review(review_id: int, db: Session
+@review_router.get('/{review_id}', response_model=ReviewDetailSchema)
+async def detail_review(review_id: int, db: AsyncSession
                         =Depends(get_db)):
-    review_db = db.query(Review).filter(Review.id == review_id).first()
+    review_db = await db.scalar(select(Review).where(Review.id == review_id))
     if not review_db:
         raise HTTPException(status_code=404, detail="Review not found")
     return review_db
 
 
-@review_router.put('/{review_id}', response_model=ReviewSchema)
-async def update_review(review_id: int, review_update: ReviewSchema,
-                        db: Session = Depends(get_db)):
-    review_db = db.query(Review).filter(Review.id == review_id).first()
-    if not review_db:
-        raise HTTPException(status_code=404, detail="Review not found")
-    for key, value in review_update.dict().items():
-        setattr(review_db, key, value)
-    db.commit()
-    db.refresh(review_db)
+@review_router.put('/{review_id}', response_model=ReviewOutSchema)
+async def update_review(review_id: int, review_update: ReviewUpdateSchema,
+                        db: AsyncSession = Depends(get_db)):
+    values = review_update.dict(exclude_unset=True)
+    old_rating = None
+    if 'rating' in values:
+        # прежняя оценка нужна агрегатам; строка блокируется до commit, чтобы
+        # параллельное изменение той же оценки не сбило счётчики
+        old = (await db.execute(select(Review.rating).where(Review.id == review_id)
+                                .with_for_update())).first()
+        if old is None:
+            raise HTTPException(status_code=404, detail="Review not found")
+        old_rating = old.rating
+    review_db = await update_returning(db, Review, review_id, values, "Review not found")
+    if 'rating' not in values:
+        await db.commit()
+        return review_db
+    await apply_review_change(db, review_db.target_id, old_rating, review_db.rating)
+    await db.commit()
+    freelancer_index.rating_changed(review_db.target_id,
+                                    (review_db.rating or 0) - (old_rating or 0),
+                                    (review_db.rating is not None) - (old_rating is not None))
     return review_db
 
 
 @review_router.delete('/{review_id}')
-async def delete_review(review_id: int, db: Session = Depends(get_db)):
-    review_db = db.query(Review).filter(Review.id == review_id).first()
-    if not review_db:
-        raise HTTPException(status_code=404, detail="Review not found")
-    db.delete(review_db)
-    db.commit()
+async def delete_review(review_id: int, db: AsyncSession = Depends(get_db)):
+    review_db = await delete_returning(db, Review, review_id, "Review not found",
+                                       Review.target_id, Review.rating, Review.project_id)
+    await db.execute(touch_projects([review_db.project_id]))
+    await apply_review_change(db, review_db.target_id, review_db.rating, None, -1)
+    await db.commit()
+    if review_db.rating is not None:
+        freelancer_index.rating_changed(review_db.target_id, -review_db.rating, -1)
     return {'message': 'Review deleted'}
 
 
@@ -1,67 +1,96 @@
-from sqlalchemy.orm import Session
-from fastapi import Depends, HTTPException, APIRouter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Body, Depends, HTTPException, APIRouter, Request
 from typing import List
-from app.db.database import SessionLocal
+from app.db.bulk import BULK_MAX_ITEMS, bulk_create, validate_items
+from app.db.conditional import cached_json_response, touch_projects, user_activity_projects
+from app.db.crud import delete_returning, update_returning
+from app.db.deps import get_db, get_primary_db
 from app.db.schemas import (SkillOutSchema,
                             SkillCreateSchema,
-                            SkillUpdateSchema)
-from app.db.models import Skill
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+                            SkillUpdateSchema,
+                            PageSchema,
+                            BulkCreateResultSchema)
+from app.db.models import Skill, UserProfile, skill_project
+from app.db.pagination import PageParams, paginate
+from app.services.cache import catalog_cache
+from app.services.ranking import freelancer_index
+from app.services.ratings import reviews_of_users, subtract_reviews
 
 
 skill_router = APIRouter(prefix='/skill', tags=["Skills"])
 
 
 @skill_router.post("/", response_model=SkillOutSchema)
-def create_skills(skill_data: SkillCreateSchema,
-                 db: Session = Depends(get_db)):
+async def create_skills(skill_data: SkillCreateSchema,
+                        db: AsyncSession = Depends(get_db)):
     new_skill = Skill(skill_name=skill_data.skill_name)
     db.add(new_skill)
-    db.commit()
-    db.refresh(new_skill)
+    await db.commit()
+    await db.refresh(new_skill)
+    await catalog_cache.invalidate("skill:")
     return new_skill
 
 
-@skill_router.get("/", response_model=List[SkillOutSchema])
-async def list_skills(db: Session = Depends(get_db)):
-    skill_db = db.query(Skill).all()
-    return skill_db
+@skill_router.post("/bulk", response_model=BulkCreateResultSchema)
+async def bulk_create_skills(items: List[dict] = Body(max_length=BULK_MAX_ITEMS),
+                             db: AsyncSession = Depends(get_db)):
+    valid, errors = validate_items(SkillCreateSchema, items)
+    result = await bulk_create(db, Skill, valid, errors)
+    await catalog_cache.invalidate("skill:")
+    return result
+
+
+@skill_router.get("/", response_model=PageSchema[SkillOutSchema])
+async def list_skills(request: Request, page: PageParams = Depends(),
+                      db: AsyncSession = Depends(get_primary_db)):
+    async def load():
+        # у справочников нет created_at, курсор только по id
+        skills = await paginate(db, select(Skill), (Skill.id,), page, descending=False)
+        return PageSchema[SkillOutSchema].model_validate(skills).model_dump(mode='json')
+
+    raw = await catalog_cache.get_or_load_raw(f"skill:list:{page.cache_key()}", load)
+    return cached_json_response(request, raw)
 
 
 @skill_router.get("/{skill_id}", response_model=SkillOutSchema)
-async def detail_skills(skill_id: int, db: Session = Depends(get_db)):
-    skill_db = db.query(Skill).filter(Skill.id == skill_id).first()
-    if not skill_db:
+async def detail_skills(skill_id: int, request: Request,
+                        db: AsyncSession = Depends(get_primary_db)):
+    async def load():
+        skill_db = await db.scalar(select(Skill).where(Skill.id == skill_id))
+        return SkillOutSchema.model_validate(skill_db).model_dump(mode='json') if skill_db else None
+
+    raw = await catalog_cache.get_or_load_raw(f"skill:detail:{skill_id}", load)
+    if raw == 'null':
         raise HTTPException(status_code=404, detail="Skill not found")
-    return skill_db
+    return cached_json_response(request, raw)
 
 
 @skill_router.put("/{skill_id}", response_model=SkillOutSchema)
 async def update_skills(skill_data: SkillUpdateSchema, skill_id:int,
-                       db: Session = Depends(get_db)):
-    skill_db = db.query(Skill).filter(Skill.id == skill_id).first()
-    if not skill_db:
-        raise HTTPException(status_code=404, detail="Skill not found")
-    skill_db.skill_name = skill_data.skill_name
-    db.commit()
-    db.refresh(skill_db)
+                       db: AsyncSession = Depends(get_db)):
+    skill_db = await update_returning(db, Skill, skill_id, skill_data.dict(exclude_unset=True),
+                                      "Skill not found")
+    await db.commit()
+    await catalog_cache.invalidate("skill:")
     return skill_db
 
 
 @skill_router.delete("/{skill_id}")
-async def delete_skills(skill_id: int, db: Session = Depends(get_db)):
-    skill_db = db.query(Skill).filter(Skill.id == skill_id).first()
-    if not skill_db:
-        raise HTTPException(status_code=404, detail="Skill not found")
-    db.delete(skill_db)
-    db.commit()
+async def delete_skills(skill_id: int, db: AsyncSession = Depends(get_db)):
+    # каскадом удаляются и пользователи с этим навыком (как и раньше через ORM)
+    users = select(UserProfile.id).where(UserProfile.skill_id == skill_id)
+    ratings = await subtract_reviews(db, reviews_of_users(users))
+    # карточки проектов теряют предложения и отзывы этих пользователей и сам навык
+    await db.execute(touch_projects(user_activity_projects(users)))
+    await db.execute(touch_projects(
+        select(skill_project.c.project_id).where(skill_project.c.skill_id == skill_id)))
+    await delete_returning(db, Skill, skill_id, "Skill not found")
+    await db.commit()
+    freelancer_index.skill_deleted(skill_id)
+    freelancer_index.ratings_replaced(ratings)
+    await catalog_cache.invalidate("skill:")
+    await catalog_cache.invalidate("category:detail:")
     return {"message": f"Skill {skill_id} deleted successfully"}
 
 
@@ -1,45 +1,80 @@
+from typing import Optional
 from fastapi import HTTPException, Depends, APIRouter
 from starlette import status
 from starlette.responses import Response
-from app.db.models import UserProfile
+from fastapi import BackgroundTasks, Query, Request
+from app.db.models import UserProfile, UserRatingStats, RoleChoices
 from app.db.schemas import (UserProfileOutSchema,
                             UserProfileUpdateSchema,
                             UserProfileDetailSchema,
-                            UserProfileCreateSchema)
-from app.db.database import SessionLocal
-from sqlalchemy.orm import Session
-from typing import List
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+                            UserProfileCreateSchema,
+                            PageSchema)
+from app.db.conditional import touch_projects, user_activity_projects
+from app.db.crud import delete_returning, update_returning
+from app.db.deps import get_db
+from app.db.loaders import USER_DETAIL_OPTIONS
+from app.db.pagination import PageParams, paginate
+from app.db.serialization import page_response
+from app.services.cache import catalog_cache
+from app.services.purge import purge_user
+from app.services.ranking import freelancer_index
+from app.services.ratings import reviews_of_users, subtract_reviews
+from app.services.security import hash_password
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
 
 
 user_router = APIRouter(prefix='/user', tags=['UserProfile'])
 
 
-@user_router.get('/', response_model=List[UserProfileOutSchema])
-async def list_user(db: Session = Depends(get_db)):
-    return db.query(UserProfile).all()
+@user_router.get('/', response_model=PageSchema[UserProfileOutSchema])
+async def list_user(request: Request,
+                    page: PageParams = Depends(),
+                    db: AsyncSession = Depends(get_db)):
+    return await page_response(request, UserProfileOutSchema,
+                               await paginate(db, select(UserProfile),
+                                              (UserProfile.created_at, UserProfile.id), page))
+
+
+# объявлен до /{user_id}, иначе "leaderboard" попадёт в user_id
+@user_router.get('/leaderboard', response_model=PageSchema[UserProfileOutSchema])
+async def leaderboard(request: Request,
+                      skill_id: Optional[int] = Query(None, gt=0),
+                      min_reviews: int = Query(1, ge=1),
+                      page: PageParams = Depends(),
+                      db: AsyncSession = Depends(get_db)):
+    # обход индекса ix_user_rating_stats_leaderboard в обратном порядке,
+    # без агрегации отзывов на лету
+    stmt = (select(UserProfile)
+            .join(UserProfile.rating_stats)
+            .options(contains_eager(UserProfile.rating_stats))
+            .where(UserProfile.role == RoleChoices.freelancer,
+                   UserRatingStats.rating_count >= min_reviews))
+    if skill_id is not None:
+        stmt = stmt.where(UserProfile.skill_id == skill_id)
+    return await page_response(request, UserProfileOutSchema,
+                               await paginate(db, stmt,
+                                              (UserRatingStats.rating_avg, UserProfile.id), page))
 
 
 @user_router.post('/', response_model=UserProfileOutSchema)
 async def create_user(user_data: UserProfileCreateSchema,
-                      db: Session = Depends(get_db)):
-    user_db = UserProfile(**user_data.dict())
+                      db: AsyncSession = Depends(get_db)):
+    user_db = UserProfile(**user_data.dict(exclude={'password'}),
+                          password=await hash_password(user_data.password))
     db.add(user_db)
-    db.commit()
-    db.refresh(user_db)
+    await db.commit()
+    await db.refresh(user_db)
+    freelancer_index.user_saved(user_db)
     return user_db
 
 
 @user_router.get('/{user_id}', response_model=UserProfileDetailSchema)
-async def detail_user(user_id: int, db: Session = Depends(get_db)):
-    user_db = db.query(UserProfile).filter(UserProfile.id == user_id).first()
+async def detail_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user_db = await db.scalar(select(UserProfile).where(UserProfile.id == user_id)
+                              .options(*USER_DETAIL_OPTIONS))
     if not user_db:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail='User not found')
@@ -48,29 +83,38 @@ async def detail_user(user_id: int, db: Session = Depends(get_db)):
 
 @user_router.put('/{user_id}', response_model=UserProfileOutSchema)
 async def update_user(user_id: int, user_data: UserProfileUpdateSchema,
-                      db: Session = Depends(get_db)):
-    user_db = db.query(UserProfile).filter(UserProfile.id == user_id).first()
-    if not user_db:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail='User not found'
-                            )
-    for user_key, user_value in user_data.dict().items():
-        setattr(user_db, user_key, user_value)
-
-    db.add(user_db)
-    db.commit()
-    db.refresh(user_db)
+                      db: AsyncSession = Depends(get_db)):
+    data = user_data.dict(exclude_unset=True)
+    if data.get('password') is not None:
+        data['password'] = await hash_password(data['password'])
+    user_db = await update_returning(db, UserProfile, user_id, data, 'User not found')
+    # RETURNING не подтягивает JOIN'ом rating_stats, а ленивая загрузка в
+    # async недоступна
+    set_committed_value(user_db, 'rating_stats', await db.get(UserRatingStats, user_id))
+    await db.commit()
+    freelancer_index.user_saved(user_db)
     return user_db
 
 
 @user_router.delete('/{user_id}')
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user_db = db.query(UserProfile).filter(UserProfile.id == user_id).first()
-    if not user_db:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail='User not found')
-    db.delete(user_db)
-    db.commit()
+async def delete_user(user_id: int, background_tasks: BackgroundTasks,
+                      background: bool = Query(False),
+                      db: AsyncSession = Depends(get_db)):
+    if background:
+        # для очень больших аккаунтов: удаление пачками после ответа
+        if await db.scalar(select(UserProfile.id).where(UserProfile.id == user_id)) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail='User not found')
+        background_tasks.add_task(purge_user, user_id)
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+    # проекты, предложения и отзывы удаляет ON DELETE CASCADE в том же DELETE
+    ratings = await subtract_reviews(db, reviews_of_users([user_id]))
+    await db.execute(touch_projects(user_activity_projects([user_id])))
+    await delete_returning(db, UserProfile, user_id, 'User not found')
+    await db.commit()
+    freelancer_index.user_deleted(user_id)
+    freelancer_index.ratings_replaced(ratings)
+    await catalog_cache.invalidate('category:detail:')
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -0,0 +1,192 @@
+import math
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import (Column, DateTime, Float, Integer, MetaData, String, Table, cast, func,
+                        inspect, literal, select, text)
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateTable
+from app.db.models import Category, Offer, Project, StatusChoices
+
+
+# Витрины аналитики: в PostgreSQL - материализованные представления,
+# которые обновляются целиком (REFRESH ... CONCURRENTLY, чтение при этом не
+# блокируется), а не считаются по projects/offers на каждый запрос.
+# В SQLite (тесты) вместо них обычные таблицы с теми же колонками,
+# заполняемые из Python. Обе витрины обновляются в одной транзакции,
+# refreshed_at у них общий. Создаёт миграция 8b1e5d3a7c40 (в ней копия
+# определений: их изменение здесь - повод для новой ревизии), для баз без
+# миграций - старт приложения (ensure_views)
+analytics_metadata = MetaData()
+
+
+def _stat_columns() -> List[Column]:
+    return [Column('project_count', Integer),
+            Column('open_project_count', Integer),
+            Column('budget_avg', Float),
+            Column('budget_p50', Float),
+            Column('budget_p90', Float),
+            Column('offer_count', Integer),
+            Column('offers_per_project', Float),
+            # медиана времени от создания проекта до первого предложения
+            Column('first_offer_p50_seconds', Float),
+            Column('refreshed_at', DateTime)]
+
+
+category_stats = Table('category_stats_mv', analytics_metadata,
+                       Column('category_id', Integer, primary_key=True),
+                       Column('category_name', String(255)),
+                       *_stat_columns())
+# одна строка; id нужен уникальному индексу для REFRESH ... CONCURRENTLY
+marketplace_stats = Table('marketplace_stats_mv', analytics_metadata,
+                          Column('id', Integer, primary_key=True),
+                          *_stat_columns())
+VIEWS = ((category_stats, 'category_id'), (marketplace_stats, 'id'))
+
+# ключ pg_try_advisory_xact_lock: обновлением занят один воркер, остальные
+# не встают в очередь за блокировкой представления
+REFRESH_LOCK_KEY = 0x616e616c
+
+
+def _first_offers():
+    return (select(Offer.project_id,
+                   func.count().label('offer_count'),
+                   func.min(Offer.created_at).label('first_offer_at'))
+            .group_by(Offer.project_id).subquery('first_offers'))
+
+
+def _aggregates(first) -> list:
+    wait = func.extract('epoch', first.c.first_offer_at - Project.created_at)
+    offer_count = func.coalesce(func.sum(first.c.offer_count), 0)
+    return [func.count(Project.id).label('project_count'),
+            func.count(Project.id).filter(Project.status == StatusChoices.open)
+            .label('open_project_count'),
+            cast(func.avg(Project.budget), Float).label('budget_avg'),
+            func.percentile_cont(0.5).within_group(Project.budget).label('budget_p50'),
+            func.percentile_cont(0.9).within_group(Project.budget).label('budget_p90'),
+            offer_count.label('offer_count'),
+            cast(offer_count, Float).op('/', return_type=Float)(
+                func.nullif(func.count(Project.id), 0)).label('offers_per_project'),
+            func.percentile_cont(0.5).within_group(wait).label('first_offer_p50_seconds'),
+            func.timezone('UTC', func.now()).label('refreshed_at')]
+
+
+def category_stats_select():
+    # категории без проектов тоже попадают в витрину, с нулями
+    first = _first_offers()
+    return (select(Category.id.label('category_id'), Category.category_name, *_aggregates(first))
+            .select_from(Category)
+            .outerjoin(Project, Project.category_id == Category.id)
+            .outerjoin(first, first.c.project_id == Project.id)
+            .group_by(Category.id, Category.category_name))
+
+
+def marketplace_stats_select():
+    first = _first_offers()
+    return (select(literal(1).label('id'), *_aggregates(first))
+            .select_from(Project)
+            .outerjoin(first, first.c.project_id == Project.id))
+
+
+def view_ddl(dialect, names=None) -> List[str]:
+    queries = {category_stats.name: category_stats_select,
+               marketplace_stats.name: marketplace_stats_select}
+    ddl = []
+    for table, key in VIEWS:
+        if names is not None and table.name not in names:
+            continue
+        if dialect.name != 'postgresql':
+            ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+            continue
+        sql = queries[table.name]().compile(dialect=dialect,
+                                            compile_kwargs={'literal_binds': True})
+        ddl.append(f'CREATE MATERIALIZED VIEW {table.name} AS {sql}')
+        ddl.append(f'CREATE UNIQUE INDEX ix_{table.name}_{key} ON {table.name} ({key})')
+    return ddl
+
+
+def _existing(sync_conn) -> set:
+    inspector = inspect(sync_conn)
+    names = set(inspector.get_table_names())
+    if sync_conn.dialect.name == 'postgresql':
+        names |= set(inspector.get_materialized_view_names())
+    return names
+
+
+async def ensure_views(conn: AsyncConnection) -> List[str]:
+    existing = await conn.run_sync(_existing)
+    missing = [table.name for table, _ in VIEWS if table.name not in existing]
+    for ddl in view_ddl(conn.dialect, missing):
+        await conn.exec_driver_sql(ddl)
+    # представления PostgreSQL заполняются при создании, таблицы SQLite - нет
+    if missing and conn.dialect.name != 'postgresql':
+        await refresh_views(conn)
+    return missing
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    # как percentile_cont: линейная интерполяция между соседними значениями
+    if not values:
+        return None
+    position = fraction * (len(values) - 1)
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _summary(projects: list, now: datetime) -> dict:
+    budgets = sorted(float(row.budget) for row in projects if row.budget is not None)
+    waits = sorted((row.first_offer_at - row.created_at).total_seconds()
+                   for row in projects if row.first_offer_at is not None)
+    offer_count = sum(row.offer_count or 0 for row in projects)
+    return {'project_count': len(projects),
+            'open_project_count': sum(row.status == StatusChoices.open for row in projects),
+            'budget_avg': sum(budgets) / len(budgets) if budgets else None,
+            'budget_p50': _percentile(budgets, 0.5),
+            'budget_p90': _percentile(budgets, 0.9),
+            'offer_count': offer_count,
+            'offers_per_project': offer_count / len(projects) if projects else None,
+            'first_offer_p50_seconds': _percentile(waits, 0.5),
+            'refreshed_at': now}
+
+
+async def _refresh_tables(conn: AsyncConnection) -> None:
+    # SQLite: те же показатели, что в представлениях, одним проходом по проектам
+    first = _first_offers()
+    rows = (await conn.execute(
+        select(Category.id, Category.category_name, Project.id.label('project_id'),
+               Project.status, Project.budget, Project.created_at,
+               first.c.offer_count, first.c.first_offer_at)
+        .select_from(Category)
+        .outerjoin(Project, Project.category_id == Category.id)
+        .outerjoin(first, first.c.project_id == Project.id))).all()
+    now = datetime.utcnow()
+    by_category = {}
+    for row in rows:
+        projects = by_category.setdefault((row.id, row.category_name), [])
+        if row.project_id is not None:
+            projects.append(row)
+    await conn.execute(category_stats.delete())
+    await conn.execute(marketplace_stats.delete())
+    if by_category:
+        await conn.execute(category_stats.insert(), [
+            {'category_id': category_id, 'category_name': name, **_summary(projects, now)}
+            for (category_id, name), projects in by_category.items()])
+    await conn.execute(marketplace_stats.insert(), [
+        {'id': 1, **_summary([row for projects in by_category.values() for row in projects], now)}])
+
+
+async def refresh_views(conn: AsyncConnection) -> bool:
+    # False - витрины уже обновляет другой воркер
+    if conn.dialect.name != 'postgresql':
+        await _refresh_tables(conn)
+        return True
+    if not await conn.scalar(text('SELECT pg_try_advisory_xact_lock(:key)'),
+                             {'key': REFRESH_LOCK_KEY}):
+        return False
+    for table, _ in VIEWS:
+        await conn.exec_driver_sql(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {table.name}')
+    return True
+
+
+async def views_refreshed_at(conn: AsyncConnection) -> Optional[datetime]:
+    return await conn.scalar(select(marketplace_stats.c.refreshed_at))
@@ -0,0 +1,102 @@
+from typing import Iterable, List, Tuple
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+BULK_MAX_ITEMS = 10000
+# строк в одном многострочном INSERT ... VALUES (...), (...) RETURNING id
+INSERT_CHUNK = 1000
+
+
+def validate_items(schema, items: List[dict]) -> Tuple[List[Tuple[int, BaseModel]], list]:
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            errors.append({"index": index,
+                           "errors": e.errors(include_url=False, include_context=False)})
+    return valid, errors
+
+
+async def missing_refs(db: AsyncSession, column, values: Iterable[int]) -> set:
+    # одним запросом на внешний ключ, а не по запросу на элемент
+    wanted = {value for value in values if value is not None}
+    if not wanted:
+        return set()
+    found = await db.scalars(select(column).where(column.in_(wanted)))
+    return wanted - set(found)
+
+
+def reject_missing(valid: list, errors: list, field: str, missing: set) -> list:
+    kept = []
+    for index, item in valid:
+        value = getattr(item, field)
+        if value in missing:
+            errors.append({"index": index,
+                           "errors": [{"loc": [field], "msg": f"{field} {value} does not exist",
+                                       "type": "foreign_key"}]})
+        else:
+            kept.append((index, item))
+    return kept
+
+
+def null_violations(model, row: dict) -> List[str]:
+    # NOT NULL колонки, которые схема допускает пустыми: такая строка уронила
+    # бы INSERT всей пачки, поэтому отсеивается заранее, как missing_refs
+    return [column.key for column in model.__table__.columns
+            if not column.nullable and not column.primary_key and row.get(column.key) is None
+            and (column.key in row or (column.default is None and column.server_default is None))]
+
+
+def reject_nulls(model, valid: list, errors: list) -> List[Tuple[int, dict]]:
+    rows = []
+    for index, item in valid:
+        row = item.dict()
+        nulls = null_violations(model, row)
+        if nulls:
+            errors.append({"index": index,
+                           "errors": [{"loc": [field], "msg": f"{field} may not be null",
+                                       "type": "not_null"} for field in nulls]})
+        else:
+            rows.append((index, row))
+    return rows
+
+
+async def insert_returning_ids(db: AsyncSession, model, rows: List[dict]) -> List[int]:
+    result = await db.execute(insert(model).returning(model.id, sort_by_parameter_order=True),
+                              rows)
+    return result.scalars().all()
+
+
+async def insert_chunk(db: AsyncSession, model, chunk: list, errors: list) -> list:
+    # пачка под SAVEPOINT; если её отклонило ограничение БД (уникальность,
+    # CHECK), строки вставляются по одной, чтобы найти и вернуть виноватые
+    try:
+        async with db.begin_nested():
+            ids = await insert_returning_ids(db, model, [row for _, row in chunk])
+        return [(index, new_id) for (index, _), new_id in zip(chunk, ids)]
+    except IntegrityError:
+        pass
+    created = []
+    for index, row in chunk:
+        try:
+            async with db.begin_nested():
+                created.append((index, (await insert_returning_ids(db, model, [row]))[0]))
+        except IntegrityError as e:
+            errors.append({"index": index,
+                           "errors": [{"loc": [], "msg": (str(e.orig).splitlines() or [''])[0],
+                                       "type": "integrity_error"}]})
+    return created
+
+
+async def bulk_create(db: AsyncSession, model, valid: list, errors: list) -> dict:
+    rows = reject_nulls(model, valid, errors)
+    created = []
+    for start in range(0, len(rows), INSERT_CHUNK):
+        created += await insert_chunk(db, model, rows[start:start + INSERT_CHUNK], errors)
+    await db.commit()
+    return {"created": [{"index": index, "id": new_id} for index, new_id in created],
+            "errors": sorted(errors, key=lambda error: error["index"])}
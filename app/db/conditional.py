@@ -0,0 +1,132 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from sqlalchemy import Select, func, or_, select, union, update
+from starlette.requests import Request
+from starlette.responses import Response
+from app.db.models import Offer, Project, Review, Skill, skill_project
+
+
+# Условные GET: валидатор (ETag, Last-Modified) считается лёгким запросом до
+# загрузки ORM-объектов; совпал с If-None-Match / If-Modified-Since - 304 без
+# тела. ETag слабый: он описывает состояние строк, а не байты ответа
+class Validators:
+    def __init__(self, etag: str, last_modified: Optional[datetime] = None):
+        self.etag = etag
+        # в БД время без зоны, в UTC. В заголовке HTTP только целые секунды;
+        # вторую запись в ту же секунду отличает ETag
+        modified = last_modified.replace(tzinfo=timezone.utc) if last_modified else None
+        self.last_modified = modified.replace(microsecond=0) if modified else None
+
+    @classmethod
+    def from_state(cls, *state, last_modified: Optional[datetime] = None) -> "Validators":
+        digest = hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
+        return cls(f'W/"{digest}"', last_modified)
+
+    @classmethod
+    def from_body(cls, body: str) -> "Validators":
+        return cls(f'W/"{hashlib.blake2b(body.encode(), digest_size=16).hexdigest()}"')
+
+    def headers(self) -> dict:
+        # no-cache: клиент может хранить ответ, но перепроверяет его каждый раз
+        headers = {'ETag': self.etag, 'Cache-Control': 'no-cache'}
+        if self.last_modified:
+            headers['Last-Modified'] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        # If-None-Match главнее If-Modified-Since (RFC 9110, 13.2.2)
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or self.etag.removeprefix('W/') in tags
+        if_modified_since = request.headers.get('if-modified-since')
+        if if_modified_since and self.last_modified:
+            try:
+                # с тем же усечением, что и Last-Modified ответа: иначе клиент,
+                # вернувший его как есть, никогда не получит 304
+                return self.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+    def apply(self, result, response: Response):
+        # готовый Response (FAST_RESPONSES) FastAPI отдаёт как есть, без
+        # заголовков из параметра response
+        target = result if isinstance(result, Response) else response
+        target.headers.update(self.headers())
+        return result
+
+
+def cached_json_response(request: Request, raw: str) -> Response:
+    # ответы справочников и так лежат в кеше готовым JSON: ETag - хеш тела,
+    # на попадании в кеш БД не читается совсем
+    validators = Validators.from_body(raw)
+    if validators.matches(request):
+        return validators.not_modified()
+    return Response(raw, media_type='application/json', headers=validators.headers())
+
+
+def _latest(*values: Optional[datetime]) -> Optional[datetime]:
+    return max((value for value in values if value is not None), default=None)
+
+
+def _children_state(model, project_ids) -> list:
+    # число и последнее изменение дочерних строк: меняются при любой вставке,
+    # правке или удалении
+    condition = model.project_id.in_(project_ids)
+    return [select(func.count()).where(condition).correlate(None).scalar_subquery(),
+            select(func.max(model.updated_at)).where(condition).correlate(None).scalar_subquery()]
+
+
+async def project_validators(db, project_id: int) -> Optional[Validators]:
+    # карточка проекта: сам проект, его предложения и отзывы; у навыков нет
+    # updated_at, их немного - в состояние идут сами id и названия.
+    # Удаление предложения или отзыва уменьшает их число, но не двигает
+    # max(updated_at) - поэтому удаления обновляют updated_at проекта
+    # (touch_projects), и Last-Modified растёт при любом изменении числа
+    row = (await db.execute(
+        select(Project.updated_at,
+               *_children_state(Offer, [project_id]),
+               *_children_state(Review, [project_id]))
+        .where(Project.id == project_id))).first()
+    if row is None:
+        return None
+    skills = (await db.execute(
+        select(Skill.id, Skill.skill_name).join(skill_project)
+        .where(skill_project.c.project_id == project_id).order_by(Skill.id))).all()
+    updated_at, _, offers_updated_at, _, reviews_updated_at = row
+    return Validators.from_state(*row, *skills,
+                                 last_modified=_latest(updated_at, offers_updated_at,
+                                                       reviews_updated_at))
+
+
+async def page_validators(db, page_stmt: Select) -> Validators:
+    # page_stmt - запрос страницы проектов (keyset_select) с тем же порядком и
+    # LIMIT, но читаются только id и updated_at; sum(id) ловит сдвиг состава
+    # страницы, предложения - offer_count и бюджеты в элементах списка.
+    # Без Last-Modified: когда строка уходит со страницы, max(updated_at)
+    # уменьшается, и If-Modified-Since дал бы устаревший 304. Решает ETag
+    page = page_stmt.with_only_columns(Project.id, Project.updated_at).subquery()
+    row = (await db.execute(
+        select(func.count(), func.coalesce(func.sum(page.c.id), 0), func.max(page.c.updated_at),
+               *_children_state(Offer, select(page.c.id)))
+        .select_from(page))).first()
+    return Validators.from_state(*row)
+
+
+def touch_projects(project_ids):
+    # вызывается в транзакции удаления дочерних строк (предложений, отзывов)
+    return (update(Project).where(Project.id.in_(project_ids))
+            .values(updated_at=func.now()).execution_options(synchronize_session=False))
+
+
+def user_activity_projects(user_ids):
+    # проекты, где каскад удаления пользователя заберёт его предложения и отзывы
+    return union(select(Offer.project_id).where(Offer.freelancer_id.in_(user_ids)),
+                 select(Review.project_id).where(or_(Review.reviewer_id.in_(user_ids),
+                                                     Review.target_id.in_(user_ids))))
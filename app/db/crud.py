@@ -0,0 +1,29 @@
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def update_returning(db: AsyncSession, model, obj_id: int, values: dict, not_found: str):
+    # Один UPDATE ... WHERE id = :id RETURNING вместо SELECT + setattr + flush +
+    # refresh; в SET только присланные поля (exclude_unset у вызывающего).
+    # commit - за вызывающим, чтобы хуки успели записать в ту же транзакцию
+    if values:
+        stmt = (update(model).where(model.id == obj_id).values(**values)
+                .returning(model).execution_options(synchronize_session=False))
+    else:
+        # пустое тело ничего не меняет - отдаём текущую строку
+        stmt = select(model).where(model.id == obj_id)
+    obj = await db.scalar(stmt)
+    if obj is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return obj
+
+
+async def delete_returning(db: AsyncSession, model, obj_id: int, not_found: str, *columns):
+    # DELETE ... RETURNING id[, columns]: без предварительного SELECT и без
+    # ORM-каскадов - дочерние строки удаляет сама БД (ON DELETE CASCADE)
+    row = (await db.execute(delete(model).where(model.id == obj_id)
+                            .returning(model.id, *columns))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return row
@@ -0,0 +1,18 @@
+from typing import AsyncIterator
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from app.db.database import async_session_maker
+from app.db.replicas import replica_router
+
+
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    # GET/HEAD - реплика, если настроена и доступна; запись - основная БД
+    async with await replica_router.open_session(request) as db:
+        yield db
+
+
+async def get_primary_db() -> AsyncIterator[AsyncSession]:
+    # для чтений, результат которых переживает запрос (кеш справочников,
+    # индекс фрилансеров): отставшая реплика закрепила бы в них старые данные
+    async with async_session_maker() as db:
+        yield db
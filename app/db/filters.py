@@ -0,0 +1,78 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum as PyEnum
+from typing import Optional
+from fastapi import Query
+from app.db.models import Offer, Project, Review, StatusChoices
+
+
+class ProjectOrder(str, PyEnum):
+    newest = "newest"
+    # ближайший дедлайн первым
+    deadline = "deadline"
+
+
+class ProjectFilter:
+    def __init__(self,
+                 order: ProjectOrder = ProjectOrder.newest,
+                 status: Optional[StatusChoices] = None,
+                 category_id: Optional[int] = Query(None, gt=0),
+                 budget_min: Optional[Decimal] = Query(None, ge=0),
+                 budget_max: Optional[Decimal] = Query(None, ge=0),
+                 deadline_from: Optional[datetime] = None,
+                 deadline_to: Optional[datetime] = None):
+        self.order = order
+        self.status = status
+        self.category_id = category_id
+        self.budget_min = budget_min
+        self.budget_max = budget_max
+        self.deadline_from = deadline_from
+        self.deadline_to = deadline_to
+
+    def conditions(self) -> list:
+        conditions = []
+        if self.status is not None:
+            conditions.append(Project.status == self.status)
+        if self.category_id is not None:
+            conditions.append(Project.category_id == self.category_id)
+        if self.budget_min is not None:
+            conditions.append(Project.budget >= self.budget_min)
+        if self.budget_max is not None:
+            conditions.append(Project.budget <= self.budget_max)
+        if self.deadline_from is not None:
+            conditions.append(Project.deadline >= self.deadline_from)
+        if self.deadline_to is not None:
+            conditions.append(Project.deadline <= self.deadline_to)
+        return conditions
+
+    def sort_keys(self) -> tuple:
+        # (ключи курсора, по убыванию?)
+        if self.order == ProjectOrder.deadline:
+            return (Project.deadline, Project.id), False
+        return (Project.created_at, Project.id), True
+
+
+class OfferFilter:
+    def __init__(self,
+                 project_id: Optional[int] = Query(None, gt=0),
+                 freelancer_id: Optional[int] = Query(None, gt=0)):
+        self.project_id = project_id
+        self.freelancer_id = freelancer_id
+
+    def conditions(self) -> list:
+        conditions = []
+        if self.project_id is not None:
+            conditions.append(Offer.project_id == self.project_id)
+        if self.freelancer_id is not None:
+            conditions.append(Offer.freelancer_id == self.freelancer_id)
+        return conditions
+
+
+class ReviewFilter:
+    def __init__(self, target_id: Optional[int] = Query(None, gt=0)):
+        self.target_id = target_id
+
+    def conditions(self) -> list:
+        if self.target_id is None:
+            return []
+        return [Review.target_id == self.target_id]
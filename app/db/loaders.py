@@ -0,0 +1,43 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.db.models import Offer, Project, UserProfile
+from app.db.offer_stats import attach_offer_stats
+from app.db.pagination import PageParams, paginate
+
+
+# Опции загрузки карточек: общие для обработчиков и прогрева кеша
+# компиляции при старте (app/services/startup.py).
+# selectinload - один запрос на коллекцию (WHERE project_id IN ...);
+# raiseload('*') превращает любую случайную ленивую загрузку в ошибку вместо N+1
+PROJECT_DETAIL_OPTIONS = (selectinload(Project.skill_required),
+                          selectinload(Project.project_reviews),
+                          raiseload('*'))
+# В карточке проекта только последние предложения - первая страница
+# GET /project/{id}/offers, остальные по её next_cursor
+PROJECT_DETAIL_OFFERS = 20
+
+# навык и агрегаты оценок (many-to-one / one-to-one) подтягиваются JOIN'ом
+# в том же запросе, отзывы - вторым запросом; всего 2 запроса
+USER_DETAIL_OPTIONS = (joinedload(UserProfile.skill),
+                       joinedload(UserProfile.rating_stats),
+                       selectinload(UserProfile.received_reviews),
+                       raiseload('*'))
+
+
+async def load_project_detail(db: AsyncSession, project_id: int) -> Optional[Project]:
+    # 5 запросов при любом числе предложений: проект, навыки, отзывы, страница
+    # предложений и агрегаты по всем предложениям (offer_count, min, медиана)
+    project = await db.scalar(select(Project).where(Project.id == project_id)
+                              .options(*PROJECT_DETAIL_OPTIONS))
+    if project is None:
+        return None
+    offers = await paginate(db, select(Offer).where(Offer.project_id == project_id)
+                            .options(raiseload('*')),
+                            (Offer.created_at, Offer.id),
+                            PageParams(cursor=None, limit=PROJECT_DETAIL_OFFERS, total=None))
+    set_committed_value(project, 'offers', offers['items'])
+    await attach_offer_stats(db, [project])
+    return project
@@ -1,7 +1,9 @@
 from decimal import Decimal
 from app.db.database import Base
+from app.db.pagination import SQLITE_DATETIME_FORMAT
 from fastapi import FastAPI
-from sqlalchemy import Integer, String, Enum, DateTime, Text, ForeignKey, DECIMAL, Table, Column, func, CheckConstraint
+from sqlalchemy import Integer, String, Enum, DateTime, Text, ForeignKey, DECIMAL, Table, Column, func, CheckConstraint, Index, Float
+from sqlalchemy import Boolean, DDL, event, false
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 from enum import Enum as PyEnum
 from typing import Optional, List
@@ -12,8 +14,8 @@ from datetime import datetime
 skill_project = Table(
     'skill_project',
     Base.metadata,
-    Column('project_id', ForeignKey('projects.id'), primary_key=True),
-    Column('skill_id', ForeignKey('skills.id'), primary_key=True)
+    Column('project_id', ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True),
+    Column('skill_id', ForeignKey('skills.id', ondelete='CASCADE'), primary_key=True)
 )
 
 
@@ -39,12 +41,14 @@ class Skill(Base):
     # Фрилансеры, обладающие этим навыком
     user_profiles:Mapped[List['UserProfile']] = relationship("UserProfile",
                                                             back_populates="skill",
-                                                            cascade="all, delete-orphan")
+                                                            cascade="all, delete-orphan",
+                                                            passive_deletes=True)
 
     # Проекты, требующие этот навык
     project_skills: Mapped[List['Project']] = relationship("Project",
                                                            secondary=skill_project,
-                                                           back_populates='skill_required')
+                                                           back_populates='skill_required',
+                                                           passive_deletes=True)
 
 
 
@@ -64,27 +68,52 @@ class UserProfile(Base):
     password: Mapped[str] = mapped_column(String(250))
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
-    skill_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("skills.id"), index=True)
+    skill_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("skills.id", ondelete='CASCADE'), index=True)
     #Клиенты могут регистрироваться без навыков, так как без optional не могут зарегистрироваться
     skill: Mapped[Optional[Skill]] = relationship('Skill', back_populates="user_profiles")
 
     # Проекты, созданные пользователем (если клиент)
     projects: Mapped[List['Project']] = relationship("Project", back_populates="client",
-                                                     cascade='all, delete-orphan')
+                                                     cascade='all, delete-orphan',
+                                                     passive_deletes=True)
 
     # Предложения, сделанные фрилансером
     offers: Mapped[List['Offer']] = relationship("Offer", back_populates="freelancer",
-                                                 cascade='all, delete-orphan')
+                                                 cascade='all, delete-orphan',
+                                                 passive_deletes=True)
 
     # Отзывы, оставленные этим пользователем
     given_reviews: Mapped[List['Review']] = relationship('Review', back_populates="reviewer",
                                                          foreign_keys='Review.reviewer_id',
-                                                         cascade='all, delete-orphan')
+                                                         cascade='all, delete-orphan',
+                                                         passive_deletes=True)
 
     # Отзывы, полученные этим пользователем
     received_reviews: Mapped[List['Review']] = relationship('Review', back_populates="target",
                                                             foreign_keys='Review.target_id',
-                                                            cascade='all, delete-orphan')
+                                                            cascade='all, delete-orphan',
+                                                            passive_deletes=True)
+
+    # Агрегаты полученных оценок, всегда загружаются вместе с пользователем (JOIN)
+    rating_stats: Mapped[Optional['UserRatingStats']] = relationship('UserRatingStats',
+                                                                     back_populates="user",
+                                                                     lazy="joined",
+                                                                     cascade='all, delete-orphan',
+                                                                     passive_deletes=True)
+
+    @property
+    def review_count(self) -> int:
+        return self.rating_stats.review_count if self.rating_stats else 0
+
+    @property
+    def rating_avg(self) -> Optional[float]:
+        return self.rating_stats.rating_avg if self.rating_stats else None
+
+    @property
+    def rating_histogram(self) -> dict:
+        stats = self.rating_stats
+        return {rating: getattr(stats, f'rating_{rating}') if stats else 0
+                for rating in range(1, 6)}
 
 
 
@@ -96,7 +125,8 @@ class Category(Base):
     category_name: Mapped[str] = mapped_column(String(32), index=True)
 
     projects: Mapped[List['Project']] = relationship("Project", back_populates="category",
-                                                     cascade="all, delete-orphan")
+                                                     cascade="all, delete-orphan",
+                                                     passive_deletes=True)
 
 
 class Project(Base):
@@ -105,7 +135,7 @@ class Project(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     project_name: Mapped[str] = mapped_column(String(255))
     description: Mapped[Optional[str]] = mapped_column(Text)
-    budget: Mapped[Optional[Decimal]] = mapped_column(DECIMAL(12,2))
+    budget: Mapped[Optional[Decimal]] = mapped_column(DECIMAL(12,2), index=True)
     deadline: Mapped[datetime] = mapped_column(DateTime)
     status: Mapped[StatusChoices] = mapped_column(Enum(StatusChoices), default=StatusChoices.open)
     created_at: Mapped[datetime] = mapped_column(DateTime,server_default=func.now())
@@ -113,28 +143,47 @@ class Project(Base):
 
 
     # Категория проекта
-    category_id: Mapped[int] = mapped_column(Integer, ForeignKey("categories.id"), index=True)
+    category_id: Mapped[int] = mapped_column(Integer, ForeignKey("categories.id", ondelete='CASCADE'))
     category: Mapped[Category] = relationship('Category', back_populates="projects")
 
 
     # Клиент, создавший проект
-    client_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id"), index=True)
+    client_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id", ondelete='CASCADE'), index=True)
     client: Mapped[UserProfile] = relationship("UserProfile", back_populates="projects")
 
 
     # manytomany убран skill_id, так как это many-to-many
     skill_required: Mapped[List[Skill]] = relationship("Skill", secondary=skill_project,
 
-                                                back_populates="project_skills")
+                                                back_populates="project_skills",
+                                                passive_deletes=True)
     # Предложения на проект
     offers: Mapped[List['Offer']] = relationship("Offer", back_populates="project",
-                                                 cascade='all, delete-orphan')
+                                                 cascade='all, delete-orphan',
+                                                 passive_deletes=True)
 
     # Отзывы по проекту
     project_reviews: Mapped[List['Review']] = relationship("Review", back_populates="project",
-                                                           cascade='all, delete-orphan')
-
-
+                                                           cascade='all, delete-orphan',
+                                                           passive_deletes=True)
+
+
+# Полнотекстовый поиск (только PostgreSQL): генерируемая колонка tsvector с GIN индексом.
+# В модель не входит - SQLite её не поддерживает, запросы обращаются к ней через
+# literal_column (см. app/db/search.py). Для существующих баз - миграция 5c81d0e2b7a4
+SEARCH_CONFIG = 'simple'
+event.listen(Project.__table__, 'after_create', DDL(
+    "ALTER TABLE projects ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(project_name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')) STORED"
+).execute_if(dialect='postgresql'))
+event.listen(Project.__table__, 'after_create', DDL(
+    "CREATE INDEX ix_projects_search_vector ON projects USING gin (search_vector)"
+).execute_if(dialect='postgresql'))
+
+
+# offers и reviews в PostgreSQL секционированы по created_at (app/db/partitions.py);
+# первичный ключ в БД составной, для ORM по-прежнему id
 class Offer(Base):
     __tablename__ = "offers"
 
@@ -143,13 +192,18 @@ class Offer(Base):
     proposed_budget: Mapped[Optional[Decimal]] = mapped_column(DECIMAL(12,2))
     proposed_deadline: Mapped[Optional[datetime]] = mapped_column(DateTime)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    # для ETag карточки и списка проектов (app/db/conditional.py)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+    # предложение закрытого проекта перенесено в архивные секции
+    # (python -m app.services.partitions archive)
+    archived: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
 
     # Проект, на который сделано предложение
-    project_id: Mapped[int] = mapped_column(Integer, ForeignKey("projects.id"), index=True)
+    project_id: Mapped[int] = mapped_column(Integer, ForeignKey("projects.id", ondelete='CASCADE'))
     project: Mapped[Project] = relationship("Project", back_populates="offers")
 
     # Фрилансер, сделавший предложение
-    freelancer_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id"), index=True)
+    freelancer_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id", ondelete='CASCADE'))
     freelancer: Mapped[UserProfile] = relationship("UserProfile", back_populates="offers")
 
 
@@ -160,29 +214,67 @@ class Review(Base):
     rating: Mapped[Optional[int]] = mapped_column(Integer, CheckConstraint("rating >= 1 AND rating <= 5"))
     comment: Mapped[Optional[str]] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
 
     # Проект, по которому оставлен отзыв
-    project_id: Mapped[int] = mapped_column(Integer, ForeignKey("projects.id"), index=True)
+    project_id: Mapped[int] = mapped_column(Integer, ForeignKey("projects.id", ondelete='CASCADE'), index=True)
     project: Mapped[Project] = relationship("Project", back_populates="project_reviews")
 
     # Кто оставил отзыв
-    reviewer_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id"), index=True)
+    reviewer_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id", ondelete='CASCADE'), index=True)
     reviewer: Mapped[UserProfile] = relationship("UserProfile", back_populates="given_reviews",
                                                  foreign_keys=[reviewer_id])
 
     # О ком отзыв
-    target_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id"), index=True)
+    target_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id", ondelete='CASCADE'))
     target: Mapped[UserProfile] = relationship("UserProfile", back_populates="received_reviews",
                                                foreign_keys=[target_id])
 
 
-
-
-
-
-
-
-
-
-
-
+class UserRatingStats(Base):
+    # Денормализованные агрегаты отзывов о пользователе. Поддерживаются в той же
+    # транзакции, что и запись отзыва (app/services/ratings.py), сверка с
+    # таблицей reviews: python -m app.services.ratings
+    __tablename__ = "user_rating_stats"
+    __table_args__ = (Index('ix_user_rating_stats_leaderboard', 'rating_avg', 'user_id'),)
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("userprofiles.id", ondelete='CASCADE'), primary_key=True)
+    review_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    # отзывы с оценкой (rating может быть пустым)
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_1: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_2: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_3: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_4: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_5: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_avg: Mapped[Optional[float]] = mapped_column(Float)
+
+    user: Mapped[UserProfile] = relationship("UserProfile", back_populates="rating_stats")
+
+
+# Индексы под списки: колонки фильтра, затем ключ курсорной пагинации.
+# В SQLite пагинация сравнивает и сортирует даты через strftime
+# (app/db/pagination.py), индекс по самой колонке там не работает - поэтому
+# для SQLite строится индекс с тем же именем по выражению.
+# Для существующих баз - миграция 3b7f0c5e9a12
+def keyset_index(name: str, *columns: Column) -> None:
+    Index(name, *columns).ddl_if(dialect='postgresql')
+    Index(name, *(func.strftime(SQLITE_DATETIME_FORMAT, column)
+                  if isinstance(column.type, DateTime) else column
+                  for column in columns)).ddl_if(dialect='sqlite')
+
+
+keyset_index('ix_userprofiles_created_at_id', UserProfile.created_at, UserProfile.id)
+keyset_index('ix_projects_created_at_id', Project.created_at, Project.id)
+keyset_index('ix_projects_category_created_at_id', Project.category_id, Project.created_at, Project.id)
+keyset_index('ix_projects_status_created_at_id', Project.status, Project.created_at, Project.id)
+keyset_index('ix_projects_deadline_id', Project.deadline, Project.id)
+# открытые проекты категории по ближайшему дедлайну
+keyset_index('ix_projects_category_status_deadline_id',
+             Project.category_id, Project.status, Project.deadline, Project.id)
+keyset_index('ix_offers_created_at_id', Offer.created_at, Offer.id)
+keyset_index('ix_offers_project_created_at_id', Offer.project_id, Offer.created_at, Offer.id)
+keyset_index('ix_offers_freelancer_created_at_id', Offer.freelancer_id, Offer.created_at, Offer.id)
+keyset_index('ix_reviews_created_at_id', Review.created_at, Review.id)
+keyset_index('ix_reviews_target_created_at_id', Review.target_id, Review.created_at, Review.id)
@@ -0,0 +1,38 @@
+from typing import Iterable, List
+from sqlalchemy import Numeric, case, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Offer, Project
+
+
+def offer_stats_query(project_ids: List[int]):
+    # Медиана без percentile_cont (его нет в SQLite): номер строки по бюджету
+    # внутри проекта, среднее одной или двух средних строк. Один запрос на всю
+    # страницу, по индексу ix_offers_project_created_at_id
+    ranked = (select(Offer.project_id, Offer.proposed_budget,
+                     func.row_number().over(partition_by=Offer.project_id,
+                                            order_by=Offer.proposed_budget.asc().nulls_last())
+                     .label('budget_rank'),
+                     func.count(Offer.proposed_budget).over(partition_by=Offer.project_id)
+                     .label('budgets'))
+              .where(Offer.project_id.in_(project_ids))
+              .subquery())
+    middle = ranked.c.budget_rank.in_([(ranked.c.budgets + 1) // 2, (ranked.c.budgets + 2) // 2])
+    return (select(ranked.c.project_id,
+                   func.count(),
+                   func.min(ranked.c.proposed_budget),
+                   cast(func.avg(case((middle, ranked.c.proposed_budget))), Numeric(12, 2)))
+            .group_by(ranked.c.project_id))
+
+
+async def attach_offer_stats(db: AsyncSession, projects: Iterable[Project]) -> None:
+    # offer_count / min_proposed_budget / median_proposed_budget для
+    # ProjectListSchema; обычные атрибуты экземпляра, в БД не хранятся
+    projects = list(projects)
+    stats = {}
+    if projects:
+        rows = await db.execute(offer_stats_query([project.id for project in projects]))
+        stats = {row[0]: row[1:] for row in rows}
+    for project in projects:
+        project.offer_count, project.min_proposed_budget, project.median_proposed_budget = \
+            stats.get(project.id, (0, None, None))
+
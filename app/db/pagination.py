@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime
+from enum import Enum as PyEnum
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import DateTime, Select, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class TotalMode(str, PyEnum):
+    exact = "exact"
+    # оценка планировщика PostgreSQL вместо полного COUNT(*)
+    estimate = "estimate"
+
+
+class PageParams:
+    def __init__(self,
+                 cursor: Optional[str] = None,
+                 limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+                 total: Optional[TotalMode] = None):
+        self.cursor = cursor
+        self.limit = limit
+        self.total = total
+
+    def cache_key(self) -> str:
+        return f"{self.cursor or ''}:{self.limit}:{self.total.value if self.total else ''}"
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, keys) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(keys):
+            raise ValueError(cursor)
+        return [datetime.fromisoformat(v) if isinstance(key.type, DateTime) else v
+                for key, v in zip(keys, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# SQLite хранит CURRENT_TIMESTAMP без микросекунд, а параметры - с ними,
+# поэтому строки сравниваются только в одном формате. Индексы под пагинацию
+# в SQLite строятся по этому же выражению (keyset_index в app/db/models.py)
+SQLITE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%f'
+
+
+def _comparable(db: AsyncSession, key, value=None):
+    expr = key if value is None else literal(value, key.type)
+    if db.bind.dialect.name == 'sqlite' and isinstance(key.type, DateTime):
+        return func.strftime(SQLITE_DATETIME_FORMAT, expr)
+    return expr
+
+
+async def count_rows(db: AsyncSession, stmt: Select, mode: TotalMode) -> int:
+    if mode == TotalMode.estimate and db.bind.dialect.name == 'postgresql':
+        sql = stmt.compile(dialect=db.bind.dialect,
+                           compile_kwargs={'literal_binds': True})
+        conn = await db.connection()
+        plan = (await conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}')).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    return await db.scalar(select(func.count()).select_from(stmt.subquery()))
+
+
+def keyset_select(db: AsyncSession, stmt: Select, keys, page: PageParams,
+                  descending: bool = True) -> Select:
+    # запрос одной страницы (+1 строка - признак следующей); отдельно от
+    # paginate, чтобы bench.plans проверял планы ровно этих запросов
+    sort_keys = [_comparable(db, key) for key in keys]
+    if page.cursor:
+        values = decode_cursor(page.cursor, keys)
+        bounds = [_comparable(db, key, value) for key, value in zip(keys, values)]
+        after = tuple_(*bounds)
+        stmt = stmt.where(tuple_(*sort_keys) < after if descending
+                          else tuple_(*sort_keys) > after)
+        # то же условие по первому ключу отдельно: по сравнению кортежей
+        # PostgreSQL не отсекает секции offers/reviews (app/db/partitions.py)
+        stmt = stmt.where(sort_keys[0] <= bounds[0] if descending
+                          else sort_keys[0] >= bounds[0])
+    order = [key.desc() if descending else key.asc() for key in sort_keys]
+    return stmt.order_by(*order).limit(page.limit + 1)
+
+
+async def paginate(db: AsyncSession, stmt: Select, keys, page: PageParams,
+                   descending: bool = True) -> dict:
+    # keyset: (created_at, id) < значения последней строки прошлой страницы,
+    # поэтому глубина страницы не влияет на стоимость запроса
+    total = await count_rows(db, stmt, page.total) if page.total else None
+    rows = (await db.scalars(keyset_select(db, stmt, keys, page, descending))).all()
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = encode_cursor([getattr(rows[-1], key.key) for key in keys])
+    return {"items": rows, "next_cursor": next_cursor, "total": total}
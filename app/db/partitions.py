@@ -0,0 +1,82 @@
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.config import PARTITION_MONTHS_AHEAD
+
+
+# Секционирование по created_at, только PostgreSQL (миграция e7a2c9d41f03):
+#   offers   LIST (archived)
+#     offers_hot      RANGE (created_at), по месяцам: offers_p202610, ...
+#     offers_archive  RANGE (created_at), по годам: offers_archive_y2025, ...
+#   reviews  RANGE (created_at), по месяцам: reviews_p202610, ...
+# Секции по умолчанию (DEFAULT) нет: строка без секции - ошибка вставки,
+# поэтому секции на PARTITION_MONTHS_AHEAD месяцев вперёд создаются заранее
+# (ensure_partitions при старте и по cron). SQLite и базы, созданные через
+# create_all, работают с обычными таблицами
+MONTHLY_PARENTS = (('offers_hot', 'offers'), ('reviews', 'reviews'))
+ARCHIVE_PARENT = 'offers_archive'
+
+Partition = Tuple[str, str]
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition(name: str, parent: str, start: date, end: date) -> Partition:
+    return name, (f"CREATE TABLE {name} PARTITION OF {parent} "
+                  f"FOR VALUES FROM ('{start}') TO ('{end}')")
+
+
+def monthly_partitions(first: date, last: date) -> List[Partition]:
+    # секции всех помесячно секционированных таблиц с first по last включительно
+    partitions = []
+    month = month_start(first)
+    while month <= last:
+        for parent, prefix in MONTHLY_PARENTS:
+            partitions.append(_partition(f"{prefix}_p{month:%Y%m}", parent,
+                                         month, add_months(month, 1)))
+        month = add_months(month, 1)
+    return partitions
+
+
+def archive_partitions(first_year: int, last_year: int) -> List[Partition]:
+    return [_partition(f"{ARCHIVE_PARENT}_y{year}", ARCHIVE_PARENT,
+                       date(year, 1, 1), date(year + 1, 1, 1))
+            for year in range(first_year, last_year + 1)]
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    if conn.dialect.name != 'postgresql':
+        return False
+    return await conn.scalar(text("SELECT to_regclass('offers_hot') IS NOT NULL"))
+
+
+async def create_missing(conn: AsyncConnection, partitions: List[Partition]) -> List[str]:
+    # CREATE TABLE ... PARTITION OF блокирует родительскую таблицу, поэтому
+    # существующие секции отсеиваются заранее, а не через IF NOT EXISTS
+    existing = set((await conn.execute(
+        text("SELECT relname FROM pg_class WHERE relname = ANY(:names)"),
+        {"names": [name for name, _ in partitions]})).scalars())
+    created = []
+    for name, ddl in partitions:
+        if name not in existing:
+            await conn.exec_driver_sql(ddl)
+            created.append(name)
+    return created
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int = PARTITION_MONTHS_AHEAD,
+                            today: Optional[date] = None) -> List[str]:
+    if not await is_partitioned(conn):
+        return []
+    current = month_start(today or datetime.utcnow())
+    last = add_months(current, months_ahead)
+    return await create_missing(conn, monthly_partitions(current, last)
+                                + archive_partitions(current.year, last.year))
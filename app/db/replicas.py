@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import List, Optional
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.requests import HTTPConnection
+from app.config import (DB_REPLICA_URLS, REPLICA_CONNECT_TIMEOUT, REPLICA_RETRY_SECONDS,
+                        REPLICA_STICKY_SECONDS)
+from app.db.database import async_session_maker, create_engine
+
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ("GET", "HEAD")
+# до какого момента (unix time) клиент читает с основной БД;
+# ставит ReadYourWritesMiddleware после успешной записи
+STICKY_COOKIE = "db_primary_until"
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_engine(url)
+        self.session_maker = async_sessionmaker(self.engine, class_=AsyncSession,
+                                                expire_on_commit=False)
+        self.unhealthy_until = 0.0
+        self.last_error: Optional[str] = None
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def mark_failed(self, error: str) -> None:
+        self.unhealthy_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        self.last_error = (error.splitlines() or [''])[0][:200]
+        logger.warning("replica %s is unavailable for %ss: %s",
+                       self.url, REPLICA_RETRY_SECONDS, self.last_error)
+
+    def mark_healthy(self) -> None:
+        self.unhealthy_until = 0.0
+        self.last_error = None
+
+    def status(self) -> dict:
+        return {"url": self.url, "status": "ok" if self.healthy() else "unavailable",
+                "error": self.last_error}
+
+
+class ReplicaRouter:
+    # GET/HEAD - по кругу на здоровые реплики, остальное - на основную БД.
+    # Задержку репликации не измеряем: свои записи клиент видит благодаря
+    # cookie, чужие - с задержкой реплики
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = itertools.count()
+
+    def wants_primary(self, request: HTTPConnection) -> bool:
+        if not self.replicas or request.scope.get("method") not in READ_METHODS:
+            return True
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _candidates(self) -> List[Replica]:
+        start = next(self._turn) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.healthy()]
+
+    async def open_session(self, request: HTTPConnection) -> AsyncSession:
+        if not self.wants_primary(request):
+            for replica in self._candidates():
+                db = replica.session_maker()
+                try:
+                    # соединение берётся сразу: недоступная реплика должна
+                    # выясниться здесь, а не посреди обработчика
+                    await asyncio.wait_for(db.connection(), REPLICA_CONNECT_TIMEOUT)
+                    return db
+                except Exception as e:
+                    await db.close()
+                    replica.mark_failed(f"{type(e).__name__}: {e}")
+        return async_session_maker()
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replica_router = ReplicaRouter(DB_REPLICA_URLS)
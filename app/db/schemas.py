@@ -1,10 +1,38 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import Optional
+from typing import Dict, Generic, List, Optional, TypeVar
 from app.db.models import RoleChoices, StatusChoices
 from datetime import datetime, date
 from decimal import Decimal
 
 
+ItemT = TypeVar('ItemT')
+
+
+#////////////////////////////////////////////////////
+class PageSchema(BaseModel, Generic[ItemT]):
+    items: List[ItemT]
+    next_cursor: Optional[str] = None  # передать как ?cursor= для следующей страницы
+    total: Optional[int] = None  # только если запрошен ?total=exact|estimate
+
+
+#////////////////////////////////////////////////////
+class BulkItemErrorSchema(BaseModel):
+    index: int  # позиция элемента во входном массиве
+    errors: List[dict]
+
+class BulkCreatedSchema(BaseModel):
+    index: int
+    id: int
+
+class BulkCreateResultSchema(BaseModel):
+    created: List[BulkCreatedSchema]
+    errors: List[BulkItemErrorSchema] = []
+
+class BulkUpdateResultSchema(BaseModel):
+    updated: List[int]
+    not_found: List[int] = []
+
+
 #////////////////////////////////////////////////////
 class SkillSchemaBase(BaseModel):
 #Базовая схема
@@ -37,8 +65,6 @@ class UserProfileBaseSchema(BaseModel):
 class UserProfileCreateSchema(UserProfileBaseSchema):
     password: str = Field(min_length=5, max_length=100)
 
-class UserProfileDetailSchema(UserProfileBaseSchema):
-    pass
 
 class UserProfileUpdateSchema(BaseModel):
     first_name: Optional[str] = Field(None, min_length=1, max_length=100)
@@ -55,8 +81,37 @@ class UserProfileUpdateSchema(BaseModel):
 class UserProfileOutSchema(UserProfileBaseSchema):
     id: int
     created_at: datetime
+    # из user_rating_stats
+    review_count: int = 0
+    rating_avg: Optional[float] = None
+    rating_histogram: Dict[int, int] = {}
     model_config = ConfigDict(from_attributes=True)
 
+class UserProfileDetailSchema(UserProfileOutSchema):
+    skill: Optional[SkillOutSchema] = None
+    received_reviews: List['ReviewOutSchema'] = []
+
+
+class LoginSchema(BaseModel):
+    email: EmailStr
+    password: str = Field(min_length=1, max_length=100)
+
+
+class TokenSchema(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: int
+
+
+class FreelancerRankSchema(BaseModel):
+    user_id: int
+    user_name: str
+    skill_id: int
+    score: float
+    rating_avg: Optional[float] = None
+    review_count: int
+    recent_offers: int
+
 
 #////////////////////////////////////////////////////
 class CategoryBaseSchema(BaseModel):
@@ -68,13 +123,14 @@ class CategoryCreateSchema(CategoryBaseSchema):
 class CategoryUpdateSchema(CategoryBaseSchema):
     pass
 
-class CategoryDetailSchema(CategoryBaseSchema):
-    pass
-
 class CategoryOutSchema(CategoryBaseSchema):
     id: int
     model_config = ConfigDict(from_attributes=True)
 
+class CategoryDetailSchema(CategoryOutSchema):
+    # последние CATEGORY_DETAIL_PROJECTS проектов, все - через /project/?category_id=
+    projects: List['ProjectOutSchema'] = []
+
 
 #////////////////////////////////////////////////////
 class ProjectBaseSchema(BaseModel):
@@ -98,8 +154,9 @@ class ProjectUpdateSchema(BaseModel):
     deadline: Optional[datetime] = None
     status: Optional[StatusChoices] = None
 
-class ProjectDetailSchema(ProjectBaseSchema):
-    pass
+class ProjectBulkStatusSchema(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=10000)
+    status: StatusChoices
 
 class ProjectOutSchema(ProjectBaseSchema):
     id: int
@@ -107,6 +164,21 @@ class ProjectOutSchema(ProjectBaseSchema):
     updated_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+class ProjectListSchema(ProjectOutSchema):
+    # агрегаты по предложениям, считаются одним запросом на страницу (app/db/offer_stats.py)
+    offer_count: int = 0
+    min_proposed_budget: Optional[Decimal] = None
+    median_proposed_budget: Optional[Decimal] = None
+
+class ProjectSearchSchema(ProjectListSchema):
+    rank: float
+
+class ProjectDetailSchema(ProjectListSchema):
+    skill_required: List[SkillOutSchema] = []
+    # последние PROJECT_DETAIL_OFFERS предложений, все - через /project/{id}/offers
+    offers: List['OfferOutSchema'] = []
+    project_reviews: List['ReviewOutSchema'] = []
+
 
 #////////////////////////////////////////////////////
 class OfferBaseSchema(BaseModel):
@@ -158,3 +230,29 @@ class ReviewOutSchema(ReviewBaseSchema):
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+
+#////////////////////////////////////////////////////
+class AnalyticsStatsSchema(BaseModel):
+    project_count: int
+    open_project_count: int
+    budget_avg: Optional[float] = None
+    budget_p50: Optional[float] = None
+    budget_p90: Optional[float] = None
+    offer_count: int
+    offers_per_project: Optional[float] = None
+    first_offer_p50_seconds: Optional[float] = None
+    refreshed_at: datetime  # когда витрина пересчитана, UTC
+
+class CategoryStatsSchema(AnalyticsStatsSchema):
+    category_id: int
+    category_name: str
+
+class CategoryStatsListSchema(BaseModel):
+    refreshed_at: Optional[datetime] = None
+    items: List[CategoryStatsSchema]
+
+
+# вложенные схемы ссылаются на классы, объявленные ниже по файлу
+UserProfileDetailSchema.model_rebuild()
+CategoryDetailSchema.model_rebuild()
+ProjectDetailSchema.model_rebuild()
@@ -0,0 +1,48 @@
+from sqlalchemy import Float, func, literal, literal_column, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Project, SEARCH_CONFIG, skill_project
+from app.db.pagination import PageParams, count_rows, decode_cursor, encode_cursor
+from app.db.offer_stats import attach_offer_stats
+from app.db.schemas import ProjectListSchema
+
+
+def _match(dialect_name: str, q: str):
+    if dialect_name == 'postgresql':
+        # websearch_to_tsquery понимает "фразы", OR и -исключения
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        vector = literal_column('projects.search_vector')
+        return vector.op('@@')(query), func.ts_rank_cd(vector, query, type_=Float)
+    # SQLite (тесты): поиск подстроки без индекса и без ранжирования
+    match = or_(Project.project_name.icontains(q, autoescape=True),
+                Project.description.icontains(q, autoescape=True))
+    return match, literal(0.0, Float)
+
+
+def skill_condition(skill_id: int):
+    return Project.id.in_(select(skill_project.c.project_id)
+                          .where(skill_project.c.skill_id == skill_id))
+
+
+async def search_projects(db: AsyncSession, q: str, conditions: list,
+                          page: PageParams) -> dict:
+    match, rank = _match(db.bind.dialect.name, q)
+    stmt = select(Project, rank.label('rank')).where(match, *conditions)
+    total = None
+    if page.total:
+        total = await count_rows(db, select(Project.id).where(match, *conditions), page.total)
+
+    # курсор по (rank, id): релевантные первыми, id разрешает равные ранги
+    keys = (rank, Project.id)
+    if page.cursor:
+        stmt = stmt.where(tuple_(*keys) < tuple_(*decode_cursor(page.cursor, keys)))
+    rows = (await db.execute(stmt.order_by(rank.desc(), Project.id.desc())
+                             .limit(page.limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = encode_cursor([rows[-1].rank, rows[-1].Project.id])
+    await attach_offer_stats(db, [row.Project for row in rows])
+    items = [{**ProjectListSchema.model_validate(row.Project).model_dump(), "rank": row.rank}
+             for row in rows]
+    return {"items": items, "next_cursor": next_cursor, "total": total}
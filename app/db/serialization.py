@@ -0,0 +1,48 @@
+import gzip
+import operator
+from functools import lru_cache
+from typing import Iterable, List, Type
+from pydantic import BaseModel
+from pydantic_core import to_json
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from app.config import FAST_RESPONSES, RESPONSE_GZIP_LEVEL, RESPONSE_GZIP_MIN_BYTES
+
+
+@lru_cache(maxsize=None)
+def _row_reader(schema: Type[BaseModel]):
+    names = tuple(schema.model_fields)
+    getter = operator.attrgetter(*names)
+    if len(names) == 1:
+        return names, lambda row: (getter(row),)
+    return names, getter
+
+
+def dump_rows(schema: Type[BaseModel], rows: Iterable) -> List[dict]:
+    # Только плоские Out-схемы: поля читаются с ORM-объекта как есть, без
+    # валидации. Decimal, datetime и Enum pydantic-core кодирует так же, как
+    # при обычной сериализации через схему
+    names, getter = _row_reader(schema)
+    return [dict(zip(names, getter(row))) for row in rows]
+
+
+async def json_response(request: Request, content) -> Response:
+    body = to_json(content)
+    headers = {}
+    if (RESPONSE_GZIP_MIN_BYTES and len(body) >= RESPONSE_GZIP_MIN_BYTES
+            and 'gzip' in request.headers.get('accept-encoding', '')):
+        # сжатие большого тела - миллисекунды CPU, не в event loop
+        body = await run_in_threadpool(gzip.compress, body, RESPONSE_GZIP_LEVEL)
+        headers = {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
+    return Response(body, media_type='application/json', headers=headers)
+
+
+async def page_response(request: Request, schema: Type[BaseModel], page: dict):
+    # Без FAST_RESPONSES страница уходит в response_model эндпоинта как раньше.
+    # С ним возвращается готовый Response, и FastAPI пропускает повторную
+    # валидацию (EmailStr и т.п.), jsonable_encoder и json.dumps; response_model
+    # остаётся для документации
+    if not FAST_RESPONSES:
+        return page
+    return await json_response(request, {**page, "items": dump_rows(schema, page["items"])})
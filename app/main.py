@@ -1,21 +1,62 @@
+import time
+# отсчёт для фазы imports в отчёте о старте (app/services/startup.py)
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI, APIRouter
 from starlette.responses import HTMLResponse
-from app.db.database import SessionLocal
 import uvicorn
+import asyncio
 from datetime import datetime
+from sqlalchemy import text
+from starlette import status
+from starlette.responses import JSONResponse, PlainTextResponse
 from app.api import (skills, users, categories,
-                     projects, offers, reviews)
+                     projects, offers, reviews, exports, auth, analytics)
+from app.config import HEALTH_DB_TIMEOUT
+from app.db.database import async_session_maker, engine, pool_stats
+from app.db.replicas import replica_router
+from app.middlewares.admission import AdmissionMiddleware
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.replicas import ReadYourWritesMiddleware
+from app.services.admission import admission
+from app.services.analytics import analytics_refresher
+from app.services.cache import catalog_cache
+from app.services.metrics import metrics_registry
+from app.services.ranking import freelancer_index
+from app.services.startup import run_startup, startup_report
 
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # соединения пула и кеш компиляции запросов готовятся до первого запроса
+    await run_startup(engine, async_session_maker)
+    tasks = []
+    if analytics_refresher.enabled:
+        tasks.append(asyncio.create_task(analytics_refresher.run(engine)))
+    if freelancer_index.enabled:
+        tasks.append(asyncio.create_task(freelancer_index.run(async_session_maker)))
+    yield
+    for task in tasks:
+        task.cancel()
+        # фоновая задача могла держать соединение - дожидаемся отмены до dispose
+        with suppress(asyncio.CancelledError):
+            await task
+    await engine.dispose()
+    await replica_router.dispose()
 
 
-freelance = FastAPI()
+freelance = FastAPI(lifespan=lifespan)
+metrics_registry.instrument(engine.sync_engine)
+analytics_refresher.instrument(engine.sync_engine)
+for replica in replica_router.replicas:
+    metrics_registry.instrument(replica.engine.sync_engine)
+# внутри MetricsMiddleware: отказы 429/503 попадают в метрики как <unmatched>
+if admission.enabled:
+    freelance.add_middleware(AdmissionMiddleware, control=admission)
+freelance.add_middleware(MetricsMiddleware, registry=metrics_registry)
+if replica_router.replicas:
+    freelance.add_middleware(ReadYourWritesMiddleware)
 
 freelance.include_router(skills.skill_router)
 freelance.include_router(users.user_router)
@@ -23,6 +64,10 @@ freelance.include_router(categories.category_router)
 freelance.include_router(projects.project_router)
 freelance.include_router(offers.offer_router)
 freelance.include_router(reviews.review_router)
+freelance.include_router(exports.export_router)
+freelance.include_router(auth.auth_router)
+freelance.include_router(analytics.analytics_router)
+startup_report.record("imports", time.perf_counter() - _import_started)
 
 
 @freelance.get("/health/")
@@ -34,6 +79,78 @@ async def health_check():
     }
 
 
+async def _probe_database(target) -> dict:
+    async def probe():
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    started = time.perf_counter()
+    try:
+        # таймаут покрывает и ожидание соединения из пула
+        await asyncio.wait_for(probe(), HEALTH_DB_TIMEOUT)
+        database = {"status": "ok"}
+    except Exception as e:
+        database = {"status": "error", "error": f"{type(e).__name__}: {e}"[:200]}
+    database["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return database
+
+
+@freelance.get("/health/ready")
+async def readiness_check():
+    # /health/ - процесс жив, /health/ready - есть соединение с БД
+    database = await _probe_database(engine)
+    # недоступная реплика не делает процесс неготовым - чтение уходит на
+    # основную БД; удачная проверка возвращает реплику в работу раньше срока
+    replicas = []
+    for replica in replica_router.replicas:
+        probe = await _probe_database(replica.engine)
+        if probe["status"] == "ok":
+            replica.mark_healthy()
+        else:
+            replica.mark_failed(probe["error"])
+        replicas.append({**replica.status(), "latency_ms": probe["latency_ms"]})
+    ready = database["status"] == "ok"
+    return JSONResponse(
+        {"status": "ok" if ready else "unavailable",
+         "database": database,
+         "replicas": replicas,
+         "pool": pool_stats.snapshot(engine.pool)},
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@freelance.get("/health/startup")
+async def startup_check():
+    return startup_report.snapshot()
+
+
+@freelance.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    pool = pool_stats.snapshot(engine.pool)
+    gauges = {f"db_pool_{name}": pool[name]
+              for name in ("checked_out", "overflow", "size", "wait_max_ms") if name in pool}
+    counters = {f"db_pool_{name}": pool[name]
+                for name in ("connections_created", "connections_invalidated", "timeouts")
+                if name in pool}
+    gauges.update({f"app_startup_{name}_seconds": round(seconds, 6)
+                   for name, seconds in startup_report.phases.items()})
+    gauges["analytics_pending_writes"] = analytics_refresher.pending_writes
+    counters["analytics_refreshes"] = analytics_refresher.refreshes
+    if analytics_refresher.last_duration is not None:
+        gauges["analytics_refresh_seconds"] = round(analytics_refresher.last_duration, 6)
+    if admission.enabled:
+        gauges.update({f"admission_in_flight_{name}": value
+                       for name, value in admission.in_flight.items()})
+        counters.update({f"admission_rejected_{name}": value
+                         for name, value in admission.rejected.items()})
+    return PlainTextResponse(metrics_registry.render(gauges, counters),
+                             media_type="text/plain; version=0.0.4")
+
+
+@freelance.get("/cache/stats/")
+async def cache_stats():
+    return catalog_cache.stats()
+
+
 
 @freelance.get("/", response_class=HTMLResponse)
 async def Home():
@@ -0,0 +1,52 @@
+import math
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.config import ADMISSION_RETRY_AFTER, RATE_LIMIT_CLIENT_HEADER
+from app.services.admission import AdmissionControl, route_class
+
+
+_CLIENT_HEADER = RATE_LIMIT_CLIENT_HEADER.encode()
+
+
+async def _reject(send: Send, status: int, retry_after: float, detail: bytes) -> None:
+    body = b'{"detail":"' + detail + b'"}'
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                            (b"retry-after", str(max(1, math.ceil(retry_after))).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    # Стоит перед маршрутизацией: отказ не трогает ни пул соединений, ни
+    # обработчик. Подключается в main.py, только если задан хоть один лимит
+    def __init__(self, app: ASGIApp, control: AdmissionControl):
+        self.app = app
+        self.control = control
+
+    def _client(self, scope: Scope) -> str:
+        if _CLIENT_HEADER:
+            for name, value in scope["headers"]:
+                if name == _CLIENT_HEADER:
+                    return value.split(b",", 1)[0].strip().decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "-"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_class(scope["method"], scope["path"])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        wait = await self.control.retry_after(self._client(scope))
+        if wait:
+            await _reject(send, 429, wait, b"Too many requests")
+            return
+        if not self.control.acquire(route):
+            await _reject(send, 503, ADMISSION_RETRY_AFTER, b"Server is busy, retry later")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.control.release(route)
@@ -0,0 +1,37 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import MetricsRegistry, RequestSql, current_sql
+
+
+class MetricsMiddleware:
+    # Чистый ASGI, без BaseHTTPMiddleware: тело ответа не буферизуется и
+    # стриминговые выгрузки не ломаются
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        sql = RequestSql()
+        token = current_sql.set(sql)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_sql.reset(token)
+            # шаблон пути (/project/{project_id}), а не сам путь - иначе
+            # каждый id стал бы отдельной серией
+            route = scope.get("route")
+            self.registry.route(scope["method"], route.path if route else "<unmatched>") \
+                .observe(status, elapsed, sql)
@@ -0,0 +1,28 @@
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import REPLICA_STICKY_SECONDS
+from app.db.replicas import READ_METHODS, STICKY_COOKIE
+
+
+class ReadYourWritesMiddleware:
+    # После успешной записи клиент REPLICA_STICKY_SECONDS секунд читает с
+    # основной БД (cookie проверяет ReplicaRouter.wants_primary). Чистый
+    # ASGI, как MetricsMiddleware
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in (*READ_METHODS, "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + REPLICA_STICKY_SECONDS
+                MutableHeaders(scope=message).append(
+                    "set-cookie", f"{STICKY_COOKIE}={until}; Max-Age={REPLICA_STICKY_SECONDS}; "
+                                  f"Path=/; HttpOnly; SameSite=Lax")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
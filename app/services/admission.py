@@ -0,0 +1,179 @@
+import logging
+import re
+import time
+from typing import Dict, List, Optional
+from app.config import (ADMISSION_LIST_CONCURRENCY, ADMISSION_READ_CONCURRENCY,
+                        ADMISSION_WRITE_CONCURRENCY, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CLIENTS,
+                        RATE_LIMIT_PER_SECOND, RATE_LIMIT_URL)
+
+
+logger = logging.getLogger(__name__)
+
+READ, LIST, WRITE = "read", "list", "write"
+
+# Списки, поиск и выгрузки: полный проход по индексу, сериализация
+# страницы, иногда COUNT(*). Списки навыков и категорий отдаются из кеша
+# и считаются обычным чтением. Новые тяжёлые GET-маршруты - сюда
+LIST_PATHS = re.compile(r"/(?:project|offers|reviews|user)/?"
+                        r"|/project/search/?"
+                        r"|/project/\d+/(?:offers|freelancers)/?"
+                        r"|/user/leaderboard/?"
+                        r"|/export/.*")
+# пробы и метрики не ограничиваются: под нагрузкой они нужнее всего
+EXEMPT_PREFIXES = ("/health/", "/metrics", "/cache/stats", "/docs", "/redoc", "/openapi.json")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if method not in ("GET", "HEAD"):
+        return WRITE
+    return LIST if LIST_PATHS.fullmatch(path) else READ
+
+
+class MemoryBuckets:
+    # бакет - [токены, время последнего обновления]; полный бакет ничем не
+    # отличается от отсутствующего, поэтому при переполнении словаря
+    # в первую очередь удаляются давно молчащие клиенты
+    name = "memory"
+
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._buckets: Dict[str, List[float]] = {}
+
+    async def take(self, key: str) -> float:
+        # 0 - запрос пропущен, иначе через сколько секунд появится токен
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._prune(now)
+            self._buckets[key] = [self.burst - 1, now]
+            return 0.0
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / self.rate
+
+    def _prune(self, now: float) -> None:
+        idle = [key for key, (tokens, updated) in self._buckets.items()
+                if tokens + (now - updated) * self.rate >= self.burst]
+        for key in idle:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_clients:
+            # клиентов слишком много и все активны - забываем старшую половину
+            by_age = sorted(self._buckets, key=lambda key: self._buckets[key][1])
+            for key in by_age[:len(by_age) // 2]:
+                del self._buckets[key]
+
+    def size(self) -> Optional[int]:
+        return len(self._buckets)
+
+
+# HMGET/HSET в одном скрипте - атомарно для всех воркеров. Время передаёт
+# клиент: воркеры одного хоста видят одни часы
+_TAKE_SCRIPT = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    # бакеты в Redis на том же хосте, общие для воркеров; лишний сетевой
+    # вызов на запрос. Redis недоступен - запросы пропускаются (fail open)
+    name = "redis"
+
+    def __init__(self, url: str, rate: float, burst: int):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_URL is set but the 'redis' package is not installed")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._warned_at = 0.0
+
+    async def take(self, key: str) -> float:
+        try:
+            wait = await self._take(keys=[f"ratelimit:{key}"],
+                                    args=[self.rate, self.burst, time.time()])
+            return float(wait)
+        except Exception as e:
+            if time.monotonic() - self._warned_at > 60:
+                self._warned_at = time.monotonic()
+                logger.warning("rate limit store is unavailable, requests are not limited: %s", e)
+            return 0.0
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class AdmissionControl:
+    # Решение принимается до маршрутизации и без ожидания: клиент сверх
+    # своего бакета получает 429, класс маршрутов сверх лимита - 503.
+    # Лимиты одновременности - на воркер, как и пул соединений с БД
+    def __init__(self, buckets=None, limits: Optional[Dict[str, int]] = None):
+        self.buckets = buckets
+        self.limits = {name: limit for name, limit in (limits or {}).items() if limit > 0}
+        self.in_flight = {name: 0 for name in (READ, LIST, WRITE)}
+        self.rejected = {"rate_limit": 0, **{name: 0 for name in (READ, LIST, WRITE)}}
+
+    @property
+    def enabled(self) -> bool:
+        return self.buckets is not None or bool(self.limits)
+
+    async def retry_after(self, client: str) -> float:
+        # > 0 - клиент исчерпал бакет
+        if self.buckets is None:
+            return 0.0
+        wait = await self.buckets.take(client)
+        if wait:
+            self.rejected["rate_limit"] += 1
+        return wait
+
+    def acquire(self, route: str) -> bool:
+        limit = self.limits.get(route)
+        if limit is not None and self.in_flight[route] >= limit:
+            self.rejected[route] += 1
+            return False
+        self.in_flight[route] += 1
+        return True
+
+    def release(self, route: str) -> None:
+        self.in_flight[route] -= 1
+
+    def stats(self) -> dict:
+        return {
+            "store": self.buckets.name if self.buckets is not None else None,
+            "clients": self.buckets.size() if self.buckets is not None else None,
+            "limits": self.limits,
+            "in_flight": dict(self.in_flight),
+            "rejected": dict(self.rejected),
+        }
+
+
+def _buckets():
+    if RATE_LIMIT_PER_SECOND <= 0:
+        return None
+    if RATE_LIMIT_URL:
+        return RedisBuckets(RATE_LIMIT_URL, RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+    return MemoryBuckets(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CLIENTS)
+
+
+admission = AdmissionControl(_buckets(), {READ: ADMISSION_READ_CONCURRENCY,
+                                          LIST: ADMISSION_LIST_CONCURRENCY,
+                                          WRITE: ADMISSION_WRITE_CONCURRENCY})
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import ANALYTICS_REFRESH_SECONDS, ANALYTICS_REFRESH_WRITES
+from app.db.analytics import ensure_views, refresh_views, views_refreshed_at
+
+
+logger = logging.getLogger(__name__)
+
+# изменения в этих таблицах меняют показатели витрин
+TRACKED_TABLES = {'projects', 'offers', 'categories'}
+CHECK_SECONDS = 5
+
+
+class AnalyticsRefresher:
+    # Фоновая задача воркера (запускается в lifespan). Записи считаются
+    # по событиям движка, поэтому учтены и bulk-эндпоинты, и фоновые задачи,
+    # но только своего воркера. Срок считается по refreshed_at в самой
+    # витрине: воркеры не обновляют её каждый по отдельности
+    def __init__(self, interval: int, writes_threshold: int):
+        self.interval = interval
+        self.writes_threshold = writes_threshold
+        self.pending_writes = 0
+        self.refreshes = 0
+        self.last_duration: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0 or self.writes_threshold > 0
+
+    def instrument(self, sync_engine) -> None:
+        @event.listens_for(sync_engine, 'after_cursor_execute')
+        def _count_writes(_conn, cursor, _statement, parameters, context, executemany):
+            if context is None or context.compiled is None or \
+                    not (context.isinsert or context.isupdate or context.isdelete):
+                return
+            table = getattr(context.compiled.statement, 'table', None)
+            if getattr(table, 'name', None) in TRACKED_TABLES:
+                rows = cursor.rowcount
+                if rows < 0:
+                    rows = len(parameters) if executemany else 1
+                self.pending_writes += rows
+
+    def due_by_writes(self) -> bool:
+        return 0 < self.writes_threshold <= self.pending_writes
+
+    async def refresh(self, engine: AsyncEngine, force: bool = False) -> bool:
+        pending = self.pending_writes
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            if not force and not self.due_by_writes():
+                if self.interval <= 0:
+                    return False
+                refreshed_at = await views_refreshed_at(conn)
+                if refreshed_at is not None and \
+                        (datetime.utcnow() - refreshed_at).total_seconds() < self.interval:
+                    return False
+            if not await refresh_views(conn):
+                return False
+        # записи, сделанные во время обновления, остаются на следующий раз
+        self.pending_writes -= pending
+        self.refreshes += 1
+        self.last_duration = time.perf_counter() - started
+        logger.info("analytics views refreshed in %.3fs after %s writes",
+                    self.last_duration, pending)
+        return True
+
+    async def run(self, engine: AsyncEngine) -> None:
+        while True:
+            await asyncio.sleep(CHECK_SECONDS)
+            try:
+                await self.refresh(engine)
+            except Exception:
+                logger.warning("analytics refresh failed", exc_info=True)
+                await asyncio.sleep(max(self.interval, CHECK_SECONDS))
+
+
+analytics_refresher = AnalyticsRefresher(ANALYTICS_REFRESH_SECONDS, ANALYTICS_REFRESH_WRITES)
+
+
+async def main() -> None:
+    from app.db.database import engine
+
+    argparse.ArgumentParser(prog='python -m app.services.analytics',
+                            description='создать недостающие витрины аналитики и '
+                                        'обновить их (для cron)').parse_args()
+    try:
+        async with engine.begin() as conn:
+            created = await ensure_views(conn)
+        if created:
+            print(f"created {', '.join(created)}")
+        if await analytics_refresher.refresh(engine, force=True):
+            print(f'refreshed in {analytics_refresher.last_duration:.3f}s')
+        else:
+            print('skipped: another refresh is running')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from app.config import CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_URL
+
+
+class MemoryBackend:
+    # TTL + LRU в памяти процесса; у каждого воркера своя копия
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._data if key.startswith(prefix)]:
+            del self._data[key]
+
+    def size(self) -> Optional[int]:
+        return len(self._data)
+
+
+class RedisBackend:
+    # общий для всех воркеров Redis-совместимый сервер; вытеснение - maxmemory-policy
+    name = "redis"
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL is set but the 'redis' package is not installed")
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self._redis.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        keys = [key async for key in self._redis.scan_iter(match=f"{prefix}*")]
+        if keys:
+            await self._redis.delete(*keys)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ReadThroughCache:
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable]):
+        # значения хранятся в JSON: одинаково для обоих бэкендов и
+        # вызывающий код не может испортить закешированный объект
+        return json.loads(await self.get_or_load_raw(key, loader))
+
+    async def get_or_load_raw(self, key: str, loader: Callable[[], Awaitable]) -> str:
+        # JSON как есть - готовое тело ответа и основа для ETag
+        raw = await self.backend.get(key)
+        if raw is not None:
+            self.hits += 1
+            return raw
+        self.misses += 1
+        raw = json.dumps(await loader())
+        await self.backend.set(key, raw, self.ttl)
+        return raw
+
+    async def invalidate(self, *prefixes: str) -> None:
+        for prefix in prefixes:
+            await self.backend.delete_prefix(prefix)
+
+    async def discard(self, *keys: str) -> None:
+        await self.backend.delete(*keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "size": self.backend.size(),
+        }
+
+
+catalog_cache = ReadThroughCache(
+    RedisBackend(CACHE_URL) if CACHE_URL else MemoryBackend(CACHE_MAX_ENTRIES),
+    ttl=CACHE_TTL,
+)
+
+
+async def invalidate_category_details(*category_ids) -> None:
+    # детальная страница категории содержит её проекты
+    await catalog_cache.discard(*{f"category:detail:{category_id}"
+                                  for category_id in category_ids if category_id})
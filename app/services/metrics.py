@@ -0,0 +1,162 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from app.config import SLOW_QUERY_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# запросов к БД на один HTTP-запрос: рост хвоста - признак N+1
+SQL_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestSql:
+    # счётчик SQL текущего HTTP-запроса, кладётся в contextvar middleware;
+    # события SQLAlchemy видят его и внутри greenlet'а AsyncSession
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+current_sql: ContextVar[Optional[RequestSql]] = ContextVar("current_sql", default=None)
+
+
+def _bucket_index(buckets: tuple, value: float) -> int:
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            return index
+    return len(buckets)
+
+
+class RouteMetrics:
+    # Создаётся один раз на (метод, шаблон пути), дальше запрос только
+    # увеличивает счётчики - без словарей меток на каждый запрос
+    __slots__ = ("method", "route", "latency", "latency_sum", "requests", "statuses",
+                 "sql_count", "sql_statements", "sql_seconds")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.latency: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.requests = 0
+        self.statuses: Dict[int, int] = {}
+        self.sql_count: List[int] = [0] * (len(SQL_COUNT_BUCKETS) + 1)
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+
+    def observe(self, status: int, seconds: float, sql: RequestSql) -> None:
+        self.requests += 1
+        self.latency[_bucket_index(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.sql_count[_bucket_index(SQL_COUNT_BUCKETS, sql.statements)] += 1
+        self.sql_statements += sql.statements
+        self.sql_seconds += sql.seconds
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: Dict[str, Dict[str, RouteMetrics]] = {}
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.slow_statements = 0
+
+    def route(self, method: str, route: str) -> RouteMetrics:
+        by_route = self.routes.get(method)
+        if by_route is None:
+            by_route = self.routes[method] = {}
+        metrics = by_route.get(route)
+        if metrics is None:
+            metrics = by_route[route] = RouteMetrics(method, route)
+        return metrics
+
+    def record_statement(self, statement: str, seconds: float) -> None:
+        self.sql_statements += 1
+        self.sql_seconds += seconds
+        sql = current_sql.get()
+        if sql is not None:
+            sql.statements += 1
+            sql.seconds += seconds
+        if seconds >= SLOW_QUERY_SECONDS:
+            self.slow_statements += 1
+            logger.warning("slow query %.3fs: %s", seconds, statement[:500])
+
+    def instrument(self, sync_engine) -> None:
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_started"].pop()
+            self.record_statement(statement, time.perf_counter() - started)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def failed(context):
+            # after_cursor_execute для упавшего запроса не вызывается
+            started = context.connection.info.get("query_started") if context.connection else None
+            if started:
+                started.pop()
+
+    def render(self, extra_gauges: Optional[Dict[str, float]] = None,
+               extra_counters: Optional[Dict[str, float]] = None) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        routes = [metrics for by_route in self.routes.values() for metrics in by_route.values()]
+        for m in routes:
+            labels = f'method="{m.method}",route="{m.route}"'
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), m.latency):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {m.latency_sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {m.requests}")
+
+        lines += ["# HELP http_responses_total Responses by route template and status.",
+                  "# TYPE http_responses_total counter"]
+        for m in routes:
+            for status, count in sorted(m.statuses.items()):
+                lines.append(f'http_responses_total{{method="{m.method}",route="{m.route}",'
+                             f'status="{status}"}} {count}')
+
+        lines += ["# HELP http_request_sql_statements SQL statements executed per request.",
+                  "# TYPE http_request_sql_statements histogram"]
+        for m in routes:
+            labels = f'method="{m.method}",route="{m.route}"'
+            cumulative = 0
+            for bound, count in zip((*SQL_COUNT_BUCKETS, "+Inf"), m.sql_count):
+                cumulative += count
+                lines.append(f'http_request_sql_statements_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_sql_statements_sum{{{labels}}} {m.sql_statements}")
+            lines.append(f"http_request_sql_statements_count{{{labels}}} {m.requests}")
+
+        lines += ["# HELP http_request_sql_seconds_total Time spent in SQL by route template.",
+                  "# TYPE http_request_sql_seconds_total counter"]
+        for m in routes:
+            lines.append(f'http_request_sql_seconds_total{{method="{m.method}",route="{m.route}"}} '
+                         f'{m.sql_seconds:.6f}')
+
+        lines += ["# TYPE db_statements_total counter",
+                  f"db_statements_total {self.sql_statements}",
+                  "# TYPE db_statement_seconds_total counter",
+                  f"db_statement_seconds_total {self.sql_seconds:.6f}",
+                  "# HELP db_slow_statements_total Statements slower than SLOW_QUERY_SECONDS.",
+                  "# TYPE db_slow_statements_total counter",
+                  f"db_slow_statements_total {self.slow_statements}"]
+        # счётчики только растут (до перезапуска воркера) - для rate() в Prometheus
+        for name, value in (extra_counters or {}).items():
+            lines += [f"# TYPE {name}_total counter", f"{name}_total {value}"]
+        for name, value in (extra_gauges or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, update
+from app.config import ARCHIVE_AFTER_MONTHS, ARCHIVE_BATCH_SIZE, PARTITION_MONTHS_AHEAD
+from app.db.models import Offer, Project, StatusChoices
+from app.db.partitions import archive_partitions, create_missing, ensure_partitions, is_partitioned
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED_STATUSES = (StatusChoices.completed, StatusChoices.cancelled)
+
+
+def archivable_offers(cutoff: datetime):
+    # предложения проектов, закрытых и не менявшихся с cutoff
+    return (select(Offer.id)
+            .join(Project, Project.id == Offer.project_id)
+            .where(Offer.archived.is_(False),
+                   Project.status.in_(CLOSED_STATUSES),
+                   Project.updated_at < cutoff))
+
+
+async def archive_offers(engine, months: int = ARCHIVE_AFTER_MONTHS,
+                         batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    # UPDATE ключа секционирования (archived) PostgreSQL выполняет как перенос
+    # строки в секцию offers_archive_yYYYY. Пачки - отдельные короткие
+    # транзакции, как в app/services/purge.py. updated_at не меняется:
+    # содержимое ответов API остаётся прежним, ETag тоже
+    cutoff = datetime.utcnow() - timedelta(days=30 * months)
+    async with engine.begin() as conn:
+        if await is_partitioned(conn):
+            years = (await conn.execute(
+                select(func.min(Offer.created_at), func.max(Offer.created_at))
+                .where(Offer.id.in_(archivable_offers(cutoff))))).one()
+            if years[0] is not None:
+                await create_missing(conn, archive_partitions(years[0].year, years[1].year))
+    archived = 0
+    while True:
+        async with engine.begin() as conn:
+            ids = archivable_offers(cutoff).limit(batch_size).scalar_subquery()
+            result = await conn.execute(update(Offer).where(Offer.id.in_(ids))
+                                        .values(archived=True, updated_at=Offer.updated_at))
+        archived += result.rowcount
+        if result.rowcount < batch_size:
+            break
+    logger.info("archived %s offers of projects closed before %s", archived, cutoff)
+    return archived
+
+
+async def main() -> None:
+    from app.db.database import engine
+
+    parser = argparse.ArgumentParser(prog='python -m app.services.partitions')
+    parser.add_argument('command', choices=['ensure', 'archive'],
+                        help='ensure - создать секции на будущие месяцы (для cron), '
+                             'archive - перенести предложения закрытых проектов в архив')
+    parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD)
+    parser.add_argument('--months', type=int, default=ARCHIVE_AFTER_MONTHS,
+                        help='archive: сколько месяцев проект закрыт и не менялся')
+    args = parser.parse_args()
+    try:
+        if args.command == 'ensure':
+            async with engine.begin() as conn:
+                created = await ensure_partitions(conn, args.months_ahead)
+            print(f"created {len(created)} partitions: {', '.join(created) or '-'}")
+        else:
+            print(f'archived {await archive_offers(engine, args.months)} offers')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+import logging
+from typing import Dict, Tuple
+from sqlalchemy import delete, select
+from app.config import PURGE_BATCH_SIZE
+from app.db.conditional import touch_projects, user_activity_projects
+from app.db.database import async_session_maker
+from app.db.models import Offer, Project, Review, UserProfile
+from app.services.cache import catalog_cache
+from app.services.ranking import freelancer_index
+from app.services.ratings import reviews_of_users, subtract_reviews
+
+
+logger = logging.getLogger(__name__)
+
+
+# Фоновое удаление пользователя с большим числом проектов/предложений/отзывов.
+# Один DELETE с каскадом держит блокировки на все дочерние строки до конца
+# транзакции; здесь они удаляются пачками по PURGE_BATCH_SIZE, каждая пачка -
+# отдельная короткая транзакция. Последним идёт обычный DELETE пользователя:
+# его каскад подбирает то, что успело появиться за время чистки.
+# Проекты, у которых пачка забирает дочерние строки, обновляются в той же
+# транзакции (touch_projects): иначе GET между пачками получил бы Last-Modified,
+# который после удаления снова давал бы 304 на устаревшие данные
+async def _delete_batches(db, table, id_column, condition, project_column=None) -> int:
+    deleted = 0
+    while True:
+        ids = (select(id_column).where(condition).order_by(id_column)
+               .limit(PURGE_BATCH_SIZE).scalar_subquery())
+        if project_column is not None:
+            await db.execute(touch_projects(select(project_column).where(id_column.in_(ids))))
+        result = await db.execute(delete(table).where(id_column.in_(ids)))
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < PURGE_BATCH_SIZE:
+            return deleted
+
+
+async def _delete_review_batches(db, user_id: int) -> Dict[int, Tuple[int, int, int]]:
+    condition = (Review.reviewer_id == user_id) | (Review.target_id == user_id) | \
+        Review.project_id.in_(select(Project.id).where(Project.client_id == user_id))
+    ratings = {}
+    while True:
+        ids = (await db.scalars(select(Review.id).where(condition)
+                                .limit(PURGE_BATCH_SIZE))).all()
+        if not ids:
+            return ratings
+        for row in await subtract_reviews(db, Review.id.in_(ids), Review.target_id != user_id):
+            ratings[row[0]] = row
+        await db.execute(touch_projects(select(Review.project_id).where(Review.id.in_(ids))))
+        await db.execute(delete(Review).where(Review.id.in_(ids)))
+        await db.commit()
+
+
+async def purge_user(user_id: int) -> None:
+    async with async_session_maker() as db:
+        ratings = await _delete_review_batches(db, user_id)
+        user_projects = select(Project.id).where(Project.client_id == user_id)
+        offers = await _delete_batches(db, Offer, Offer.id,
+                                       (Offer.freelancer_id == user_id)
+                                       | Offer.project_id.in_(user_projects), Offer.project_id)
+        # отзывы и предложения уже удалены, каскад проекта задевает только skill_project
+        projects = await _delete_batches(db, Project, Project.id, Project.client_id == user_id)
+
+        for row in await subtract_reviews(db, reviews_of_users([user_id])):
+            ratings[row[0]] = row
+        # строки, появившиеся за время чистки, забирает каскад этого DELETE
+        await db.execute(touch_projects(user_activity_projects([user_id])))
+        await db.execute(delete(UserProfile).where(UserProfile.id == user_id))
+        await db.commit()
+
+    freelancer_index.user_deleted(user_id)
+    freelancer_index.ratings_replaced(ratings.values())
+    if projects:
+        await catalog_cache.invalidate("category:detail:")
+    logger.info("purged user %s: %s projects, %s offers", user_id, projects, offers)
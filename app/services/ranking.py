@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import logging
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import RANKING_REBUILD_SECONDS
+from app.db.models import Offer, RoleChoices, UserProfile, UserRatingStats
+
+
+logger = logging.getLogger(__name__)
+
+# вклад компонентов в итоговый score (0..1)
+SKILL_WEIGHT = 0.5
+RATING_WEIGHT = 0.35
+ACTIVITY_WEIGHT = 0.15
+# байесовское сглаживание: новичок с одним отзывом "5" не обгоняет
+# фрилансера с сотней отзывов "4.9"
+RATING_PRIOR_MEAN = 3.5
+RATING_PRIOR_COUNT = 5
+ACTIVITY_WINDOW_DAYS = 30
+ACTIVITY_CAP = 20
+# как часто фоновая задача проверяет срок индекса
+CHECK_SECONDS = 5
+
+
+class FreelancerStats:
+    __slots__ = ("user_id", "user_name", "skill_id", "rating_sum", "rating_count",
+                 "recent_offers", "key")
+
+    def __init__(self, user_id: int, user_name: str, skill_id: int):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.skill_id = skill_id
+        self.rating_sum = 0
+        self.rating_count = 0
+        self.recent_offers = 0
+        # позиция в корзине навыка на момент вставки
+        self.key: Tuple[float, int] = (0.0, user_id)
+
+    def quality(self) -> float:
+        rating = ((self.rating_sum + RATING_PRIOR_MEAN * RATING_PRIOR_COUNT)
+                  / (self.rating_count + RATING_PRIOR_COUNT))
+        activity = min(self.recent_offers, ACTIVITY_CAP) / ACTIVITY_CAP
+        return RATING_WEIGHT * rating / 5 + ACTIVITY_WEIGHT * activity
+
+
+# Инвертированный индекс навык -> фрилансеры в памяти процесса.
+# Строится одним проходом по БД при первом обращении, дальше раз в
+# RANKING_REBUILD_SECONDS его перестраивает фоновая задача воркера (run,
+# запускается в lifespan), чтобы подхватить записи других воркеров и
+# "состарить" активность. Запросы тем временем читают текущий индекс, новый
+# подменяет его целиком. Между перестроениями индекс обновляется хуками из
+# обработчиков пользователей, отзывов и предложений.
+# Корзина навыка - список (-quality, user_id), отсортированный по убыванию
+# качества, поэтому top-N - это слияние голов нескольких корзин, а не
+# перебор всех фрилансеров навыка.
+class FreelancerIndex:
+    def __init__(self, rebuild_seconds: int):
+        self.rebuild_seconds = rebuild_seconds
+        self.by_skill: Dict[int, List[Tuple[float, int]]] = defaultdict(list)
+        self.stats: Dict[int, FreelancerStats] = {}
+        self.built_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rebuild_seconds > 0
+
+    def expired(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at >= self.rebuild_seconds
+
+    async def ensure_built(self, db: AsyncSession) -> None:
+        # в пути запроса - только первая сборка, устаревший индекс
+        # перестраивает run
+        if self.built_at is not None:
+            return
+        async with self._lock:
+            if self.built_at is None:
+                await self.rebuild(db)
+
+    async def run(self, session_maker) -> None:
+        while True:
+            await asyncio.sleep(CHECK_SECONDS)
+            if not self.expired() or self._lock.locked():
+                continue
+            try:
+                async with self._lock, session_maker() as db:
+                    started = time.perf_counter()
+                    await self.rebuild(db)
+                logger.info("freelancer index rebuilt in %.3fs: %s freelancers",
+                            time.perf_counter() - started, len(self.stats))
+            except Exception:
+                logger.warning("freelancer index rebuild failed", exc_info=True)
+                await asyncio.sleep(max(self.rebuild_seconds, CHECK_SECONDS))
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        stats: Dict[int, FreelancerStats] = {}
+        freelancers = await db.execute(
+            select(UserProfile.id, UserProfile.user_name, UserProfile.skill_id)
+            .where(UserProfile.role == RoleChoices.freelancer,
+                   UserProfile.skill_id.is_not(None)))
+        for user_id, user_name, skill_id in freelancers:
+            stats[user_id] = FreelancerStats(user_id, user_name, skill_id)
+
+        # готовые агрегаты из user_rating_stats вместо GROUP BY по reviews
+        ratings = await db.execute(
+            select(UserRatingStats.user_id, UserRatingStats.rating_sum,
+                   UserRatingStats.rating_count))
+        for user_id, rating_sum, rating_count in ratings:
+            if user_id in stats:
+                stats[user_id].rating_sum = rating_sum or 0
+                stats[user_id].rating_count = rating_count
+
+        since = datetime.utcnow() - timedelta(days=ACTIVITY_WINDOW_DAYS)
+        offers = await db.execute(
+            select(Offer.freelancer_id, func.count())
+            .where(Offer.created_at >= since).group_by(Offer.freelancer_id))
+        for user_id, offer_count in offers:
+            if user_id in stats:
+                stats[user_id].recent_offers = offer_count
+
+        self.load(stats.values())
+
+    def load(self, entries: Iterable[FreelancerStats]) -> None:
+        by_skill: Dict[int, List[Tuple[float, int]]] = defaultdict(list)
+        stats: Dict[int, FreelancerStats] = {}
+        for entry in entries:
+            entry.key = (-entry.quality(), entry.user_id)
+            by_skill[entry.skill_id].append(entry.key)
+            stats[entry.user_id] = entry
+        for bucket in by_skill.values():
+            bucket.sort()
+        # без await между присваиваниями: запрос не увидит половину подмены
+        self.by_skill, self.stats = by_skill, stats
+        self.built_at = time.monotonic()
+
+    def _insert(self, entry: FreelancerStats) -> None:
+        entry.key = (-entry.quality(), entry.user_id)
+        insort(self.by_skill[entry.skill_id], entry.key)
+
+    def _remove(self, entry: FreelancerStats) -> None:
+        bucket = self.by_skill.get(entry.skill_id, [])
+        position = bisect_left(bucket, entry.key)
+        if position < len(bucket) and bucket[position] == entry.key:
+            del bucket[position]
+
+    # --- инкрементальные обновления (вызываются после commit) ---
+
+    def user_saved(self, user: UserProfile) -> None:
+        if self.built_at is None:
+            return
+        entry = self.stats.pop(user.id, None)
+        if entry is not None:
+            self._remove(entry)
+        if user.role != RoleChoices.freelancer or user.skill_id is None:
+            return
+        if entry is None:
+            entry = FreelancerStats(user.id, user.user_name, user.skill_id)
+        entry.user_name, entry.skill_id = user.user_name, user.skill_id
+        self.stats[user.id] = entry
+        self._insert(entry)
+
+    def user_deleted(self, user_id: int) -> None:
+        entry = self.stats.pop(user_id, None)
+        if entry is not None:
+            self._remove(entry)
+
+    def rating_changed(self, user_id: int, rating_delta: int, count_delta: int) -> None:
+        entry = self.stats.get(user_id)
+        if entry is not None:
+            self._remove(entry)
+            entry.rating_sum += rating_delta
+            entry.rating_count += count_delta
+            self._insert(entry)
+
+    def ratings_replaced(self, rows: Iterable[Tuple[int, int, int]]) -> None:
+        # (user_id, rating_sum, rating_count) - уже пересчитанные значения
+        for user_id, rating_sum, rating_count in rows:
+            entry = self.stats.get(user_id)
+            if entry is not None:
+                self._remove(entry)
+                entry.rating_sum, entry.rating_count = rating_sum or 0, rating_count
+                self._insert(entry)
+
+    def skill_deleted(self, skill_id: int) -> None:
+        # каскад удалил всех пользователей с этим навыком - это вся его корзина
+        for _, user_id in self.by_skill.pop(skill_id, ()):
+            self.stats.pop(user_id, None)
+
+    def offers_created(self, freelancer_ids: Iterable[int]) -> None:
+        for user_id in freelancer_ids:
+            entry = self.stats.get(user_id)
+            if entry is not None:
+                self._remove(entry)
+                entry.recent_offers += 1
+                self._insert(entry)
+
+    # --- запрос ---
+
+    def top(self, skill_ids: List[int], limit: int, exclude: Iterable[int] = ()) -> List[dict]:
+        wanted = set(skill_ids)
+        if not wanted:
+            return []
+        excluded = set(exclude)
+        # у фрилансера один навык: вклад совпадения навыков одинаков для всех
+        # кандидатов, и порядок определяется только качеством
+        overlap = SKILL_WEIGHT / len(wanted)
+        best = []
+        for _, user_id in heapq.merge(*(self.by_skill.get(skill_id, ()) for skill_id in wanted)):
+            if user_id in excluded:
+                continue
+            best.append(self.stats[user_id])
+            if len(best) == limit:
+                break
+        return [{
+            "user_id": entry.user_id,
+            "user_name": entry.user_name,
+            "skill_id": entry.skill_id,
+            "score": round(overlap + entry.quality(), 4),
+            "rating_avg": (round(entry.rating_sum / entry.rating_count, 2)
+                           if entry.rating_count else None),
+            "review_count": entry.rating_count,
+            "recent_offers": entry.recent_offers,
+        } for entry in best]
+
+
+freelancer_index = FreelancerIndex(RANKING_REBUILD_SECONDS)
@@ -0,0 +1,136 @@
+# Агрегаты оценок пользователей (таблица user_rating_stats).
+#
+#     python -m app.services.ratings reconcile [--check]
+#
+# reconcile пересчитывает агрегаты по таблице reviews (первичное заполнение
+# и сверка после ручных правок БД), --check только сообщает о расхождениях.
+import argparse
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, delete, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Project, Review, UserRatingStats
+
+
+RATINGS = range(1, 6)
+STATS_COLUMNS = ('review_count', 'rating_count', 'rating_sum',
+                 *(f'rating_{rating}' for rating in RATINGS))
+
+
+def _deltas(old_rating: Optional[int], new_rating: Optional[int], review_delta: int) -> Dict[str, int]:
+    deltas = dict.fromkeys(STATS_COLUMNS, 0)
+    deltas['review_count'] = review_delta
+    deltas['rating_count'] = (new_rating is not None) - (old_rating is not None)
+    deltas['rating_sum'] = (new_rating or 0) - (old_rating or 0)
+    if old_rating is not None:
+        deltas[f'rating_{old_rating}'] -= 1
+    if new_rating is not None:
+        deltas[f'rating_{new_rating}'] += 1
+    return deltas
+
+
+async def apply_review_change(db: AsyncSession, user_id: int, old_rating: Optional[int],
+                              new_rating: Optional[int], review_delta: int = 0) -> None:
+    # Вызывается до commit, в транзакции самого отзыва. Инкремент выполняется
+    # в одном UPSERT на стороне БД, поэтому параллельные отзывы о том же
+    # пользователе не теряют обновления
+    deltas = _deltas(old_rating, new_rating, review_delta)
+    if not any(deltas.values()):
+        return
+    table = UserRatingStats.__table__
+    dialect_insert = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    values = {name: max(delta, 0) for name, delta in deltas.items()}
+    values['rating_avg'] = (values['rating_sum'] / values['rating_count']
+                            if values['rating_count'] else None)
+    stmt = dialect_insert(table).values(user_id=user_id, **values)
+    new_sum = table.c.rating_sum + deltas['rating_sum']
+    new_count = table.c.rating_count + deltas['rating_count']
+    update = {name: table.c[name] + delta for name, delta in deltas.items() if delta}
+    update['rating_avg'] = case((new_count > 0, new_sum * 1.0 / new_count), else_=None)
+    await db.execute(stmt.on_conflict_do_update(index_elements=[table.c.user_id], set_=update))
+
+
+def _counters() -> list:
+    # в порядке STATS_COLUMNS
+    return [func.count(),
+            func.count(Review.rating),
+            func.coalesce(func.sum(Review.rating), 0),
+            *(func.count(case((Review.rating == rating, 1))) for rating in RATINGS)]
+
+
+def _aggregate_query():
+    return select(Review.target_id, *_counters(), func.avg(Review.rating)).group_by(Review.target_id)
+
+
+def reviews_of_users(user_ids):
+    # отзывы, которые БД удалит каскадом вместе с пользователями: оставленные
+    # ими и по их проектам. Отзывы о самих пользователях не считаются - их
+    # строки user_rating_stats удаляются тем же каскадом
+    return (or_(Review.reviewer_id.in_(user_ids),
+                Review.project_id.in_(select(Project.id).where(Project.client_id.in_(user_ids))))
+            & Review.target_id.not_in(user_ids))
+
+
+async def subtract_reviews(db: AsyncSession, *conditions) -> List[Tuple[int, int, int]]:
+    # Вызывается до удаления проекта/категории/пользователя, в той же
+    # транзакции: отзывы удалит ON DELETE CASCADE, а их вклад вычитается
+    # одним UPDATE ... FROM (агрегат по удаляемым отзывам).
+    # Возвращает (user_id, rating_sum, rating_count) после вычитания
+    table = UserRatingStats.__table__
+    removed = (select(Review.target_id.label('removed_user_id'),
+                      *(counter.label(f'removed_{name}')
+                        for name, counter in zip(STATS_COLUMNS, _counters())))
+               .where(*conditions).group_by(Review.target_id).subquery())
+    values = {name: table.c[name] - removed.c[f'removed_{name}'] for name in STATS_COLUMNS}
+    new_sum, new_count = values['rating_sum'], values['rating_count']
+    values['rating_avg'] = case((new_count > 0, new_sum * 1.0 / new_count), else_=None)
+    # SQLite не даёт ссылаться в RETURNING на таблицы из FROM, поэтому
+    # возвращаются новые значения, а не вычтенные
+    rows = await db.execute(update(table).where(table.c.user_id == removed.c.removed_user_id)
+                            .values(values)
+                            .returning(table.c.user_id, table.c.rating_sum, table.c.rating_count))
+    return [tuple(row) for row in rows]
+
+
+async def reconcile(db: AsyncSession, check_only: bool = False) -> int:
+    expected = {row[0]: tuple(row[1:-1]) for row in await db.execute(_aggregate_query())}
+    actual = {row[0]: tuple(row[1:]) for row in await db.execute(
+        select(UserRatingStats.user_id,
+               *(getattr(UserRatingStats, name) for name in STATS_COLUMNS)))}
+    # строка с нулями после удаления всех отзывов равна отсутствию строки
+    empty = (0,) * len(STATS_COLUMNS)
+    mismatched = sum(1 for user_id in expected.keys() | actual.keys()
+                     if expected.get(user_id, empty) != actual.get(user_id, empty))
+    if check_only or not mismatched:
+        return mismatched
+    # полная замена одним INSERT ... SELECT в одной транзакции
+    await db.execute(delete(UserRatingStats))
+    await db.execute(insert(UserRatingStats).from_select(
+        ['user_id', *STATS_COLUMNS, 'rating_avg'], _aggregate_query()))
+    await db.commit()
+    return mismatched
+
+
+async def main() -> None:
+    from app.db.database import async_session_maker, engine
+
+    parser = argparse.ArgumentParser(prog='python -m app.services.ratings')
+    parser.add_argument('command', choices=['reconcile'])
+    parser.add_argument('--check', action='store_true',
+                        help='только сообщить о расхождениях')
+    args = parser.parse_args()
+    try:
+        async with async_session_maker() as db:
+            mismatched = await reconcile(db, check_only=args.check)
+    finally:
+        await engine.dispose()
+    action = 'found' if args.check else 'fixed'
+    print(f'{action} {mismatched} mismatched user_rating_stats rows')
+    if args.check and mismatched:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
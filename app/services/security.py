@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from app.config import (ACCESS_TOKEN_TTL, PASSWORD_HASH_WORKERS, PASSWORD_SCRYPT_N,
+                        PASSWORD_SCRYPT_P, PASSWORD_SCRYPT_R, SECRET_KEY, TOKEN_CACHE_SIZE)
+
+
+# --- пароли ---
+
+HASH_SCHEME = 'scrypt'
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# scrypt освобождает GIL, поэтому потоков достаточно; пул ограничен, чтобы
+# волна входов не заняла все ядра, остальные запросы ждут в очереди пула
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                    thread_name_prefix='password-hash')
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2), dklen=KEY_BYTES)
+
+
+def _hash_sync(password: str) -> str:
+    salt = secrets.token_bytes(SALT_BYTES)
+    key = _scrypt(password, salt, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return (f'{HASH_SCHEME}${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}'
+            f'${_b64(salt)}${_b64(key)}')
+
+
+def _verify_sync(password: str, encoded: str) -> bool:
+    parts = encoded.split('$')
+    if len(parts) != 6 or parts[0] != HASH_SCHEME:
+        # пароли, сохранённые до хеширования, открытым текстом
+        return hmac.compare_digest(password.encode(), encoded.encode())
+    _, n, r, p, salt, key = parts
+    return hmac.compare_digest(_scrypt(password, _unb64(salt), int(n), int(r), int(p)),
+                               _unb64(key))
+
+
+def needs_rehash(encoded: str) -> bool:
+    return not encoded.startswith(
+        f'{HASH_SCHEME}${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$')
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, _hash_sync, password)
+
+
+async def verify_password(password: str, encoded: Optional[str]) -> bool:
+    # для несуществующего пользователя тоже считаем хеш - время ответа не
+    # выдаёт, зарегистрирован ли email
+    loop = asyncio.get_running_loop()
+    if encoded is None:
+        await loop.run_in_executor(_hash_executor, _hash_sync, password)
+        return False
+    return await loop.run_in_executor(_hash_executor, _verify_sync, password, encoded)
+
+
+# --- токены (JWT HS256) ---
+
+_TOKEN_HEADER = _b64(json.dumps({'alg': 'HS256', 'typ': 'JWT'}, separators=(',', ':')).encode())
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _sign(signing_input: str) -> str:
+    return _b64(hmac.new(SECRET_KEY.encode(), signing_input.encode(), hashlib.sha256).digest())
+
+
+def create_access_token(user_id: int, ttl: int = ACCESS_TOKEN_TTL) -> Tuple[str, int]:
+    now = int(time.time())
+    payload = _b64(json.dumps({'sub': str(user_id), 'iat': now, 'exp': now + ttl},
+                              separators=(',', ':')).encode())
+    signing_input = f'{_TOKEN_HEADER}.{payload}'
+    return f'{signing_input}.{_sign(signing_input)}', now + ttl
+
+
+class TokenCache:
+    # Уже проверенные токены: повторный запрос с тем же токеном не
+    # пересчитывает HMAC и не разбирает JSON, проверяется только срок
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+
+    def verify(self, token: str) -> int:
+        entry = self._data.get(token)
+        if entry is None:
+            entry = self._data[token] = _decode(token)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            self._data.pop(token, None)
+            raise InvalidToken('expired')
+        self._data.move_to_end(token)
+        return user_id
+
+
+def _decode(token: str) -> Tuple[int, int]:
+    try:
+        header, payload, signature = token.split('.')
+        if header != _TOKEN_HEADER:
+            raise InvalidToken('unsupported header')
+        if not hmac.compare_digest(_sign(f'{header}.{payload}'), signature):
+            raise InvalidToken('bad signature')
+        claims = json.loads(_unb64(payload))
+        return int(claims['sub']), int(claims['exp'])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidToken('malformed')
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
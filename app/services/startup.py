@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Optional
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+from app.config import DB_WARMUP_CONNECTIONS, SCHEMA_CHECK, SECRET_KEY_GENERATED
+from app.db.analytics import ensure_views
+from app.db.conditional import page_validators, project_validators
+from app.db.filters import ProjectFilter, ProjectOrder
+from app.db.loaders import USER_DETAIL_OPTIONS, load_project_detail
+from app.db.models import Category, Offer, Project, Review, Skill, UserProfile
+from app.db.offer_stats import offer_stats_query
+from app.db.pagination import PageParams, keyset_select, paginate
+from app.db.partitions import ensure_partitions
+
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / 'alembic.ini'
+
+
+class StartupReport:
+    # длительность фаз холодного старта в порядке выполнения; отдаётся в
+    # /health/startup и пишется в лог одной строкой
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.compiled_statements = 0
+        self.warm_connections = 0
+        self.schema: dict = {"status": "unchecked"}
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = seconds
+
+    @asynccontextmanager
+    async def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        return {
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "total_ms": round(sum(self.phases.values()) * 1000, 3),
+            "warm_connections": self.warm_connections,
+            "compiled_statements": self.compiled_statements,
+            "schema": self.schema,
+        }
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.phases.items())
+        return (f"startup {sum(self.phases.values()) * 1000:.1f} ms ({phases}); "
+                f"{self.warm_connections} connections, "
+                f"{self.compiled_statements} compiled statements")
+
+
+startup_report = StartupReport()
+
+
+async def first_connection(engine: AsyncEngine) -> None:
+    # на первом соединении диалект один раз читает версию сервера и настройки
+    async with startup_report.phase("engine_init"):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> int:
+    if not isinstance(engine.pool, QueuePool):
+        # SQLite в памяти - одно общее соединение
+        return 1
+    connections = min(connections, engine.pool.size())
+    async with startup_report.phase("pool_warmup"):
+        # соединения держатся одновременно, иначе пул отдаст одно и то же
+        conns = [engine.connect() for _ in range(connections)]
+        try:
+            await asyncio.gather(*(conn.start() for conn in conns))
+        finally:
+            await asyncio.gather(*(conn.close() for conn in conns))
+    return connections
+
+
+async def _prime_queries(db) -> None:
+    # Те же построители запросов, что у горячих эндпоинтов: ключ кеша
+    # компиляции зависит только от структуры запроса, параметры - нет.
+    # На существующих строках срабатывают и selectinload-запросы карточек
+    page = PageParams(cursor=None, limit=20, total=None)
+    for order in ProjectOrder:
+        # значения по умолчанию у фильтров - объекты Query, поэтому все явно
+        filters = ProjectFilter(order=order, status=None, category_id=None, budget_min=None,
+                                budget_max=None, deadline_from=None, deadline_to=None)
+        stmt = select(Project).where(*filters.conditions())
+        keys, descending = filters.sort_keys()
+        await page_validators(db, keyset_select(db, stmt, keys, page, descending))
+        await paginate(db, stmt, keys, page, descending=descending)
+    for model in (Offer, Review, UserProfile):
+        await paginate(db, select(model), (model.created_at, model.id), page)
+    for model in (Skill, Category):
+        await paginate(db, select(model), (model.id,), page, descending=False)
+    await db.execute(offer_stats_query([0]))
+
+    project_id = await db.scalar(select(Project.id).limit(1)) or 0
+    await project_validators(db, project_id)
+    await load_project_detail(db, project_id)
+    user_id = await db.scalar(select(UserProfile.id).limit(1)) or 0
+    await db.scalar(select(UserProfile).where(UserProfile.id == user_id)
+                    .options(*USER_DETAIL_OPTIONS))
+    for model in (Offer, Review, Skill, UserProfile):
+        await db.scalar(select(model).where(model.id == 0))
+
+
+async def create_partitions(engine: AsyncEngine) -> None:
+    # страховка на случай, если cron (python -m app.services.partitions ensure)
+    # не запускался: без секции на текущий месяц вставка упадёт
+    async with startup_report.phase("partitions"):
+        async with engine.begin() as conn:
+            created = await ensure_partitions(conn)
+    if created:
+        logger.info("created partitions: %s", ", ".join(created))
+
+
+async def create_analytics_views(engine: AsyncEngine) -> None:
+    # для баз, созданных без миграций (create_all); в PostgreSQL
+    # представление сразу считается по всем проектам
+    async with startup_report.phase("analytics_views"):
+        async with engine.begin() as conn:
+            created = await ensure_views(conn)
+    if created:
+        logger.info("created analytics views: %s", ", ".join(created))
+
+
+async def prime_compiled_cache(engine: AsyncEngine, session_maker) -> int:
+    cache = engine.sync_engine._compiled_cache
+    before = len(cache) if cache is not None else 0
+    async with startup_report.phase("compile_cache"):
+        async with session_maker() as db:
+            await _prime_queries(db)
+            await db.rollback()
+    return (len(cache) if cache is not None else 0) - before
+
+
+def _error(e: Exception) -> str:
+    return f"{type(e).__name__}: {(str(e).splitlines() or [''])[0]}"[:200]
+
+
+def _script_heads() -> set:
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_heads())
+
+
+async def check_schema(engine: AsyncEngine) -> dict:
+    async with startup_report.phase("schema_check"):
+        try:
+            async with engine.connect() as conn:
+                current = set((await conn.execute(
+                    text("SELECT version_num FROM alembic_version"))).scalars())
+        except Exception as e:
+            # таблицы нет - схема создана не миграциями (create_all)
+            return {"status": "unversioned", "error": _error(e)}
+        try:
+            # разбор файлов миграций - синхронный, не в event loop
+            heads = await asyncio.to_thread(_script_heads)
+        except Exception as e:
+            return {"status": "unknown", "current": sorted(current),
+                    "error": _error(e)}
+    return {"status": "ok" if current == heads else "outdated",
+            "current": sorted(current), "head": sorted(heads)}
+
+
+async def run_startup(engine: AsyncEngine, session_maker,
+                      connections: Optional[int] = None) -> StartupReport:
+    connections = DB_WARMUP_CONNECTIONS if connections is None else connections
+    if SECRET_KEY_GENERATED:
+        logger.warning("SECRET_KEY is not set, tokens are signed with a random per-process key: "
+                       "they are invalidated on restart and rejected by other workers")
+    try:
+        await first_connection(engine)
+        if SCHEMA_CHECK != 'off':
+            startup_report.schema = await check_schema(engine)
+        for create in (create_partitions, create_analytics_views):
+            try:
+                await create(engine)
+            except Exception:
+                # воркеры стартуют одновременно: проигравший гонку получает
+                # "already exists", но прогрев пула ему всё равно нужен
+                logger.warning("startup %s failed", create.__name__, exc_info=True)
+        if connections > 0:
+            startup_report.warm_connections = await warm_pool(engine, connections)
+            startup_report.compiled_statements = await prime_compiled_cache(engine,
+                                                                            session_maker)
+    except Exception:
+        # БД недоступна - процесс всё равно стартует, это покажет /health/ready
+        logger.warning("startup warm-up failed", exc_info=True)
+    if startup_report.schema["status"] not in ("ok", "unchecked"):
+        if SCHEMA_CHECK == 'strict':
+            raise RuntimeError(f"database schema does not match migrations: "
+                               f"{startup_report.schema}")
+        logger.warning("database schema does not match migrations: %s", startup_report.schema)
+    logger.info(startup_report.summary())
+    return startup_report
@@ -0,0 +1,99 @@
+"""Per-request overhead of AdmissionMiddleware, in microseconds.
+
+    python -m bench.admission --requests 200000 --clients 1000
+
+Drives the middleware directly with ASGI scopes and a no-op inner app, and
+subtracts the cost of calling that app without it. Rate limiting (in-memory
+buckets, generous enough that nothing is rejected) and all three
+concurrency caps are on, so every request pays for the full check.
+"rejected" is the cost of answering 429 to a client with an empty bucket.
+Exits with status 1 if any case exceeds --budget-us (20 by default).
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.middlewares.admission import AdmissionMiddleware
+from app.services.admission import LIST, READ, WRITE, AdmissionControl, MemoryBuckets
+
+
+CASES = [
+    ('read', 'GET', '/project/17'),
+    ('list', 'GET', '/project/'),
+    ('list (offers)', 'GET', '/project/17/offers'),
+    ('write', 'POST', '/offers/'),
+    ('exempt', 'GET', '/health/ready'),
+]
+
+
+async def noop_app(scope, receive, send) -> None:
+    pass
+
+
+async def noop_send(message) -> None:
+    pass
+
+
+async def receive() -> dict:
+    return {'type': 'http.request', 'body': b''}
+
+
+def scopes(method: str, path: str, clients: int) -> list:
+    return [{'type': 'http', 'method': method, 'path': path, 'headers': [],
+             'client': (f'10.0.{i // 256}.{i % 256}', 40000)} for i in range(clients)]
+
+
+async def run(app, batch: list, requests: int) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        await app(batch[i % len(batch)], receive, noop_send)
+    return (time.perf_counter() - started) / requests
+
+
+async def best_of(repeat: int, app, batch: list, requests: int) -> float:
+    return min([await run(app, batch, requests) for _ in range(repeat)])
+
+
+async def bench(args) -> bool:
+    # бакеты с запасом: проверяется стоимость пропуска, а не отказа
+    control = AdmissionControl(MemoryBuckets(rate=1e9, burst=10 ** 9, max_clients=args.clients * 2),
+                               {READ: 64, LIST: 8, WRITE: 16})
+    middleware = AdmissionMiddleware(noop_app, control)
+    ok = True
+    print(f'us per request (best of {args.repeat}, {args.requests} requests, '
+          f'{args.clients} clients)')
+    print(f"{'case':16} {'bare':>8} {'admitted':>9} {'overhead':>9}")
+    for name, method, path in CASES:
+        batch = scopes(method, path, args.clients)
+        bare = await best_of(args.repeat, noop_app, batch, args.requests)
+        admitted = await best_of(args.repeat, middleware, batch, args.requests)
+        overhead = (admitted - bare) * 1e6
+        ok &= overhead <= args.budget_us
+        print(f'{name:16} {bare * 1e6:8.2f} {admitted * 1e6:9.2f} {overhead:9.2f}')
+
+    empty = AdmissionMiddleware(noop_app, AdmissionControl(
+        MemoryBuckets(rate=1e-9, burst=1, max_clients=args.clients * 2)))
+    batch = scopes('GET', '/project/', args.clients)
+    await run(empty, batch, args.clients)
+    rejected = await best_of(args.repeat, empty, batch, args.requests) * 1e6
+    ok &= rejected <= args.budget_us
+    print(f"{'rejected (429)':16} {'':8} {rejected:9.2f} {rejected:9.2f}")
+    assert control.in_flight == {READ: 0, LIST: 0, WRITE: 0}, control.in_flight
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200_000)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget-us', type=float, default=20.0)
+    args = parser.parse_args()
+    if not asyncio.run(bench(args)):
+        print(f'over budget of {args.budget_us} us per request')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
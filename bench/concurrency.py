@@ -0,0 +1,122 @@
+"""Before/after: sync Session inside ``async def`` vs AsyncSession.
+
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python -m bench.concurrency --clients 64
+
+"Before" is the pre-async handler pattern mounted on a throwaway app,
+"after" is the real ``freelance`` app. Both serve ``GET /project/`` from
+the same seeded database. SQLite has no network round trip, so on SQLite
+``--rtt-ms`` adds an artificial per-statement delay in the thread that
+runs the statement (the event loop for the sync session, the aiosqlite
+worker for AsyncSession), the way a remote PostgreSQL would.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.util import await_only
+
+from app.config import SYNC_DB_URL
+from app.db.database import engine
+from app.db.models import Base, Category, Project, UserProfile
+from app.db.schemas import ProjectOutSchema
+from app.main import freelance
+
+
+def seed(projects: int) -> None:
+    engine = create_engine(SYNC_DB_URL)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        category = Category(category_name='bench')
+        client = UserProfile(first_name='Bench', last_name='Client', user_name='bench',
+                             email='bench@example.com', password='benchpass')
+        db.add_all([category, client])
+        db.flush()
+        deadline = datetime.utcnow() + timedelta(days=30)
+        db.add_all(Project(project_name=f'project {i}', category_id=category.id,
+                           client_id=client.id, deadline=deadline)
+                   for i in range(projects))
+        db.commit()
+    engine.dispose()
+
+
+def emulate_rtt(sync_engine, rtt: float, is_async: bool) -> None:
+    def on_statement(_sql):
+        time.sleep(rtt)
+
+    @event.listens_for(sync_engine, 'connect')
+    def set_trace(dbapi_conn, _record):
+        if is_async:
+            await_only(dbapi_conn.driver_connection.set_trace_callback(on_statement))
+        else:
+            dbapi_conn.set_trace_callback(on_statement)
+
+
+def blocking_app(rtt: float) -> FastAPI:
+    # Прежний вариант: синхронная сессия внутри async def
+    engine = create_engine(SYNC_DB_URL)
+    if rtt:
+        emulate_rtt(engine, rtt, is_async=False)
+    session_local = sessionmaker(bind=engine)
+
+    async def get_db():
+        db = session_local()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get('/project/', response_model=List[ProjectOutSchema])
+    async def list_project(db: Session = Depends(get_db)):
+        return db.scalars(select(Project).limit(50)).all()
+
+    return app
+
+
+async def drive(app, path: str, clients: int, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    per_client = requests // clients
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+
+        async def worker():
+            for _ in range(per_client):
+                response = await client.get(path)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return per_client * clients / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--projects', type=int, default=50)
+    parser.add_argument('--rtt-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    seed(args.projects)
+    rtt = args.rtt_ms / 1000 if engine.dialect.name == 'sqlite' else 0
+    if rtt:
+        emulate_rtt(engine.sync_engine, rtt, is_async=True)
+    path = '/project/?limit=50'
+    before = await drive(blocking_app(rtt), path, args.clients, args.requests)
+    after = await drive(freelance, path, args.clients, args.requests)
+    await engine.dispose()
+    print(f'clients={args.clients} requests={args.requests} rtt={rtt * 1000:.1f}ms')
+    print(f'before (sync session):  {before:8.1f} req/s')
+    print(f'after  (AsyncSession):  {after:8.1f} req/s')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
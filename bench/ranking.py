@@ -0,0 +1,61 @@
+"""Latency of FreelancerIndex.top() on a synthetic in-memory index.
+
+    python -m bench.ranking --users 1000000 --skills 200
+
+The index is filled directly (no database), with a skewed skill
+distribution so that a few popular skills have very large buckets.
+"""
+import argparse
+import random
+import time
+
+from app.services.ranking import FreelancerIndex, FreelancerStats
+
+
+def build(users: int, skills: int) -> FreelancerIndex:
+    rnd = random.Random(1)
+    index = FreelancerIndex(rebuild_seconds=10 ** 9)
+    weights = [1 / (rank + 1) for rank in range(skills)]
+    skill_ids = rnd.choices(range(1, skills + 1), weights=weights, k=users)
+    entries = []
+    for user_id, skill_id in enumerate(skill_ids, start=1):
+        entry = FreelancerStats(user_id, f'user{user_id}', skill_id)
+        entry.rating_count = rnd.randint(0, 40)
+        entry.rating_sum = entry.rating_count * rnd.randint(3, 5)
+        entry.recent_offers = rnd.randint(0, 30)
+        entries.append(entry)
+    index.load(entries)
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--skills', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = build(args.users, args.skills)
+    print(f'built {args.users} users in {time.perf_counter() - started:.1f}s')
+
+    rnd = random.Random(2)
+    samples = []
+    for _ in range(args.queries):
+        # проекты чаще требуют популярные навыки
+        skill_ids = rnd.choices(range(1, args.skills + 1),
+                                weights=[1 / (rank + 1) for rank in range(args.skills)],
+                                k=rnd.randint(1, 3))
+        started = time.perf_counter()
+        index.top(skill_ids, 10)
+        samples.append(time.perf_counter() - started)
+        # и поток инкрементальных обновлений между запросами
+        index.rating_changed(rnd.randint(1, args.users), 5, 1)
+        index.offers_created([rnd.randint(1, args.users)])
+    samples.sort()
+    pick = lambda p: samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+    print(f'top-10: p50={pick(0.50):.2f}ms p95={pick(0.95):.2f}ms p99={pick(0.99):.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Cost of turning a page of ORM rows into a JSON body, per 10k rows.
+
+    python -m bench.serialization --rows 10000 --repeat 5
+
+"default" is what FastAPI does with ``response_model``: validate the page
+from attributes, dump it to Python, run ``jsonable_encoder`` and
+``json.dumps``. "fast" is ``app.db.serialization`` (FAST_RESPONSES=1).
+"fast+gzip" adds compression at RESPONSE_GZIP_LEVEL. Rows are detached ORM
+objects with every attribute set, as they are after a query, so no
+database is needed.
+"""
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from app.config import RESPONSE_GZIP_LEVEL
+from app.db.models import (Offer, Project, RoleChoices, StatusChoices, UserProfile,
+                           UserRatingStats)
+from app.db.schemas import OfferOutSchema, PageSchema, ProjectOutSchema, UserProfileOutSchema
+from app.db.serialization import dump_rows
+
+
+def make_rows(rows: int) -> dict:
+    now = datetime.utcnow()
+    users = [UserProfile(id=i, first_name='Bench', last_name=f'User{i}', user_name=f'bench{i}',
+                         email=f'bench{i}@example.com', age=30, phone_number=None,
+                         role=RoleChoices.freelancer, biography='five words of biography',
+                         avatar=None, created_at=now,
+                         rating_stats=UserRatingStats(user_id=i, review_count=3, rating_count=3,
+                                                      rating_sum=13, rating_1=0, rating_2=0,
+                                                      rating_3=1, rating_4=1, rating_5=1,
+                                                      rating_avg=13 / 3))
+             for i in range(rows)]
+    projects = [Project(id=i, project_name=f'project {i}', category_id=1, client_id=2,
+                        description='bench project description', budget=Decimal('1500.00'),
+                        deadline=now + timedelta(days=30), status=StatusChoices.open,
+                        created_at=now, updated_at=now)
+                for i in range(rows)]
+    offers = [Offer(id=i, message='bench offer', proposed_budget=Decimal('900.50'),
+                    proposed_deadline=now, project_id=1, freelancer_id=2, created_at=now)
+              for i in range(rows)]
+    return {UserProfileOutSchema: users, ProjectOutSchema: projects, OfferOutSchema: offers}
+
+
+def default_path(adapter: TypeAdapter, page: dict) -> bytes:
+    validated = adapter.validate_python(page, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(validated, mode='json'))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def fast_path(schema, page: dict) -> bytes:
+    return to_json({**page, 'items': dump_rows(schema, page['items'])})
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    per = 10_000 / args.rows * 1000
+    print(f'ms per 10k rows (best of {args.repeat})')
+    print(f"{'schema':22} {'default':>9} {'fast':>9} {'fast+gzip':>10} {'speedup':>8} {'bytes':>10} {'gzip':>9}")
+    for schema, rows in make_rows(args.rows).items():
+        adapter = TypeAdapter(PageSchema[schema])
+        page = {'items': rows, 'next_cursor': None, 'total': None}
+        # обе ветки должны давать один и тот же JSON
+        body = fast_path(schema, page)
+        assert json.loads(body) == json.loads(default_path(adapter, page)), schema.__name__
+        default = best_of(args.repeat, lambda: default_path(adapter, page))
+        fast = best_of(args.repeat, lambda: fast_path(schema, page))
+        zipped = best_of(args.repeat, lambda: gzip.compress(fast_path(schema, page),
+                                                            RESPONSE_GZIP_LEVEL))
+        size = len(gzip.compress(body, RESPONSE_GZIP_LEVEL))
+        print(f'{schema.__name__:22} {default * per:9.1f} {fast * per:9.1f} {zipped * per:10.1f} '
+              f'{default / fast:7.1f}x {len(body):10d} {size:9d}')
+
+
+if __name__ == '__main__':
+    main()
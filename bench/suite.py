@@ -0,0 +1,234 @@
+"""Mixed read/write load test across all routers, in-process.
+
+    python -m bench.suite --database-url sqlite+aiosqlite:///./bench.db \\
+        --duration 30 --clients 32 --output bench-results.json
+
+Seeds users, skills, categories, projects, offers and reviews with
+``bench.seed`` (same size and ``--skew`` options), then drives a weighted
+mix of requests through ``httpx.ASGITransport`` against the real
+``freelance`` app for ``--duration`` seconds. Prints p50/p95/p99 and RPS per
+endpoint and writes them, with the git commit and run settings, to JSON.
+The run is deterministic for a given ``--seed`` except for interleaving.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import asdict
+from datetime import datetime, timedelta
+
+from bench.seed import Plan, add_plan_arguments, plan_from_args, seed_database
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(['git', *args], capture_output=True, text=True).stdout.strip()
+    return {'commit': git('rev-parse', 'HEAD') or None,
+            'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def percentile(ordered: list, p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def workload(plan: Plan, rnd: random.Random):
+    # (имя, вес, построитель запроса); имя - шаблон пути, как в /metrics.
+    # Построитель возвращает (метод, url, тело[, заголовки])
+    from app.services.security import create_access_token
+
+    freelancers, users, categories = plan.freelancers, plan.users, plan.categories
+    projects, deadline = plan.projects, (datetime.utcnow() + timedelta(days=10)).isoformat()
+    # токены выпускаются заранее: /auth/me меряет проверку, а не выпуск
+    tokens = [create_access_token(user_id)[0]
+              for user_id in rnd.sample(range(1, users + 1), min(users, 100))]
+    # удаляются засеянные строки, каждая по одному разу - без 404
+    doomed_offers = iter(rnd.sample(range(1, plan.offers + 1), plan.offers))
+    doomed_reviews = iter(rnd.sample(range(1, plan.reviews + 1), plan.reviews))
+    skill_names = itertools.count(1)
+
+    def project_id():
+        return rnd.randint(1, projects)
+
+    def client_id():
+        return rnd.randint(freelancers + 1, users)
+
+    def category_id():
+        return rnd.randint(1, categories)
+
+    return [
+        ('GET /project/', 12, lambda: ('GET', '/project/?limit=20', None)),
+        ('GET /project/?status', 6, lambda: ('GET', '/project/?status=open&limit=20', None)),
+        ('GET /project/{id}', 12, lambda: ('GET', f'/project/{project_id()}', None)),
+        ('GET /project/search', 5, lambda: ('GET', '/project/search?q=' + rnd.choice(
+            ('api', 'design shop', 'mobile bot', 'parser')), None)),
+        ('GET /project/{id}/freelancers', 4, lambda: ('GET', f'/project/{project_id()}/freelancers',
+                                                      None)),
+        ('GET /user/', 4, lambda: ('GET', '/user/?limit=20', None)),
+        ('GET /user/{id}', 8, lambda: ('GET', f'/user/{rnd.randint(1, users)}', None)),
+        ('GET /user/leaderboard', 3, lambda: ('GET', '/user/leaderboard?limit=20', None)),
+        ('GET /offers/?project_id', 4, lambda: ('GET', f'/offers/?project_id={project_id()}',
+                                                None)),
+        ('GET /project/{id}/offers', 4, lambda: ('GET', f'/project/{project_id()}/offers', None)),
+        ('GET /reviews/?target_id', 5, lambda: ('GET', '/reviews/?target_id='
+                                                f'{rnd.randint(1, freelancers)}', None)),
+        ('GET /skill/', 4, lambda: ('GET', '/skill/', None)),
+        ('GET /category/', 3, lambda: ('GET', '/category/', None)),
+        ('GET /category/{id}', 2, lambda: ('GET', f'/category/{rnd.randint(1, categories)}',
+                                           None)),
+        ('POST /offers/', 6, lambda: ('POST', '/offers/', {
+            'message': 'bench offer', 'proposed_budget': f'{rnd.randint(50, 5000)}.00',
+            'proposed_deadline': deadline, 'project_id': project_id(),
+            'freelancer_id': rnd.randint(1, freelancers)})),
+        ('POST /reviews/', 3, lambda: ('POST', '/reviews/', {
+            'rating': rnd.randint(1, 5), 'comment': 'bench review', 'project_id': project_id(),
+            'reviewer_id': client_id(), 'target_id': rnd.randint(1, freelancers)})),
+        ('POST /project/', 2, lambda: ('POST', '/project/', {
+            'project_name': 'bench project', 'description': 'created by the load test',
+            'category_id': rnd.randint(1, categories), 'client_id': client_id(),
+            'budget': '1000.00', 'deadline': deadline, 'status': 'open'})),
+        ('PUT /project/{id}', 2, lambda: ('PUT', f'/project/{project_id()}', {
+            'project_name': 'bench project', 'description': 'updated by the load test',
+            'category_id': rnd.randint(1, categories), 'client_id': client_id(),
+            'budget': '1200.00', 'deadline': deadline,
+            'status': rnd.choice(('open', 'in_progress', 'completed'))})),
+        ('DELETE /offers/{id}', 1, lambda: ('DELETE', f'/offers/{next(doomed_offers)}', None)),
+        ('DELETE /reviews/{id}', 1, lambda: ('DELETE', f'/reviews/{next(doomed_reviews)}',
+                                             None)),
+        ('POST /skill/', 1, lambda: ('POST', '/skill/', {
+            'skill_name': f'bench skill {next(skill_names)}'})),
+        # имя прежнее: меняется только кеш справочника, а не данные
+        ('PUT /category/{id}', 1, lambda: (lambda i: ('PUT', f'/category/{i}', {
+            'category_name': f'category {i}'}))(category_id())),
+        # небольшие потоковые выгрузки: стриминг и сериализация вне пула запросов
+        ('GET /export/offers', 2, lambda: ('GET', f'/export/offers?project_id={project_id()}',
+                                           None)),
+        ('GET /export/reviews', 1, lambda: ('GET', '/export/reviews?format=csv&target_id='
+                                           f'{rnd.randint(1, freelancers)}', None)),
+        # scrypt в пуле потоков; засеянные пароли открытые - первый вход перехеширует
+        ('POST /auth/login', 1, lambda: (lambda i: ('POST', '/auth/login', {
+            'email': f'user{i}@example.com', 'password': 'seedpass'}))(rnd.randint(1, users))),
+        ('GET /auth/me', 3, lambda: ('GET', '/auth/me', None,
+                                     {'Authorization': f'Bearer {rnd.choice(tokens)}'})),
+        ('GET /analytics/categories', 2, lambda: ('GET', '/analytics/categories', None)),
+        ('GET /analytics/marketplace', 1, lambda: ('GET', '/analytics/marketplace', None)),
+    ]
+
+
+async def drive(plan: Plan, clients: int, duration: float, rnd: random.Random) -> dict:
+    import httpx
+    from app.main import freelance
+
+    ops = workload(plan, rnd)
+    names = [name for name, _, _ in ops]
+    weights = [weight for _, weight, _ in ops]
+    builders = {name: build for name, _, build in ops}
+    samples, errors = defaultdict(list), defaultdict(int)
+    transport = httpx.ASGITransport(app=freelance)
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                name = rnd.choices(names, weights)[0]
+                method, url, body, *headers = builders[name]()
+                started = time.perf_counter()
+                response = await client.request(method, url, json=body,
+                                                headers=headers[0] if headers else None)
+                elapsed = time.perf_counter() - started
+                samples[name].append(elapsed)
+                if response.status_code >= 400:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        wall = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        ordered = sorted(samples[name])
+        endpoints[name] = {
+            'requests': len(ordered),
+            'errors': errors[name],
+            'rps': round(len(ordered) / wall, 2),
+            'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+            'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        }
+    everything = sorted(s for values in samples.values() for s in values)
+    return {
+        'wall_seconds': round(wall, 3),
+        'total': {'requests': len(everything),
+                  'errors': sum(errors.values()),
+                  'rps': round(len(everything) / wall, 2),
+                  'p50_ms': round(percentile(everything, 0.50) * 1000, 3),
+                  'p95_ms': round(percentile(everything, 0.95) * 1000, 3),
+                  'p99_ms': round(percentile(everything, 0.99) * 1000, 3)},
+        'endpoints': endpoints,
+    }
+
+
+def report(result: dict) -> None:
+    print(f"{'endpoint':34} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    rows = [*result['endpoints'].items(), ('TOTAL', result['total'])]
+    for name, stats in rows:
+        print(f"{name:34} {stats['requests']:7d} {stats['errors']:5d} {stats['rps']:8.1f} "
+              f"{stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='по умолчанию DATABASE_URL из окружения')
+    add_plan_arguments(parser, users=3000, skills=50, categories=20, projects=10000,
+                       offers=50000, reviews=20000)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--output', help='куда записать JSON с результатами')
+    args = parser.parse_args()
+    if args.database_url:
+        # до импорта app: engine создаётся при импорте app.db.database
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from app.db.analytics import ensure_views, refresh_views
+    from app.db.database import engine
+
+    plan = plan_from_args(args)
+    try:
+        print(f'seeding {plan} into {engine.url.render_as_string()}', file=sys.stderr)
+        seeded_at = time.perf_counter()
+        await seed_database(engine, plan, reset=True)
+        # витрины /analytics: без lifespan их никто не создаст и не обновит
+        async with engine.begin() as conn:
+            if not await ensure_views(conn):
+                await refresh_views(conn)
+        seed_seconds = time.perf_counter() - seeded_at
+        result = await drive(plan, args.clients, args.duration, random.Random(args.seed + 1))
+    finally:
+        await engine.dispose()
+
+    report(result)
+    if args.output:
+        payload = {
+            'git': git_revision(),
+            'started_at': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'database': engine.dialect.name,
+            'settings': {'clients': args.clients, 'duration': args.duration, **asdict(plan)},
+            'seed_seconds': round(seed_seconds, 3),
+            **result,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(payload, f, indent=2)
+        print(f'results written to {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
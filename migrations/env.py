@@ -5,6 +5,7 @@ from sqlalchemy import pool
 from app.db.models import *
 from alembic import context
 from app.db.models import Base
+from app.config import SYNC_DB_URL
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -15,6 +16,9 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# URL берётся из окружения (DATABASE_URL), а не из alembic.ini
+config.set_main_option("sqlalchemy.url", SYNC_DB_URL.replace('%', '%%'))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
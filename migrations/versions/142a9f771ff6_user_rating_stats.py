@@ -0,0 +1,47 @@
+"""user rating stats
+
+Revision ID: 142a9f771ff6
+Revises: 5c81d0e2b7a4
+Create Date: 2026-10-18 14:02:17.318902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '142a9f771ff6'
+down_revision: Union[str, Sequence[str], None] = '5c81d0e2b7a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    counters = ['review_count', 'rating_count', 'rating_sum',
+                'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+    op.create_table('user_rating_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    *(sa.Column(name, sa.Integer(), server_default='0', nullable=False) for name in counters),
+    sa.Column('rating_avg', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['userprofiles.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_rating_stats_leaderboard', 'user_rating_stats',
+                    ['rating_avg', 'user_id'], unique=False)
+    # первичное заполнение по существующим отзывам
+    op.execute(
+        "INSERT INTO user_rating_stats (user_id, review_count, rating_count, rating_sum, "
+        "rating_1, rating_2, rating_3, rating_4, rating_5, rating_avg) "
+        "SELECT target_id, count(*), count(rating), coalesce(sum(rating), 0), "
+        + ', '.join(f"count(CASE WHEN rating = {r} THEN 1 END)" for r in range(1, 6))
+        + ", avg(rating) FROM reviews GROUP BY target_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_rating_stats_leaderboard', table_name='user_rating_stats')
+    op.drop_table('user_rating_stats')
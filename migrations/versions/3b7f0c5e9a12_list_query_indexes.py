@@ -0,0 +1,97 @@
+"""list query indexes
+
+Revision ID: 3b7f0c5e9a12
+Revises: 9d4e6b1f2a37
+Create Date: 2026-10-18 16:05:12.540921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7f0c5e9a12'
+down_revision: Union[str, Sequence[str], None] = '9d4e6b1f2a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DATETIME_COLUMNS = ('created_at', 'deadline')
+# формат на момент ревизии (SQLITE_DATETIME_FORMAT в app/db/pagination.py)
+SQLITE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%f'
+
+# составные индексы под списки (см. keyset_index в app/db/models.py)
+NEW_INDEXES = [
+    ('ix_projects_category_created_at_id', 'projects', ['category_id', 'created_at', 'id']),
+    ('ix_projects_status_created_at_id', 'projects', ['status', 'created_at', 'id']),
+    ('ix_projects_deadline_id', 'projects', ['deadline', 'id']),
+    ('ix_projects_category_status_deadline_id', 'projects',
+     ['category_id', 'status', 'deadline', 'id']),
+    ('ix_offers_project_created_at_id', 'offers', ['project_id', 'created_at', 'id']),
+    ('ix_offers_freelancer_created_at_id', 'offers', ['freelancer_id', 'created_at', 'id']),
+    ('ix_reviews_target_created_at_id', 'reviews', ['target_id', 'created_at', 'id']),
+]
+# одноколоночные индексы, которые стали префиксами составных
+REPLACED_INDEXES = [
+    ('ix_projects_category_id', 'projects', ['category_id']),
+    ('ix_projects_status', 'projects', ['status']),
+    ('ix_projects_deadline', 'projects', ['deadline']),
+    ('ix_offers_project_id', 'offers', ['project_id']),
+    ('ix_offers_freelancer_id', 'offers', ['freelancer_id']),
+    ('ix_reviews_target_id', 'reviews', ['target_id']),
+]
+# в SQLite пересоздаются по выражению strftime
+KEYSET_INDEXES = [
+    ('ix_userprofiles_created_at_id', 'userprofiles', ['created_at', 'id']),
+    ('ix_projects_created_at_id', 'projects', ['created_at', 'id']),
+    ('ix_offers_created_at_id', 'offers', ['created_at', 'id']),
+    ('ix_reviews_created_at_id', 'reviews', ['created_at', 'id']),
+]
+
+
+def _sqlite_columns(columns):
+    return [sa.text(f"strftime('{SQLITE_DATETIME_FORMAT}', {column})")
+            if column in DATETIME_COLUMNS else column for column in columns]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        # CONCURRENTLY не блокирует запись в таблицы, но не работает внутри
+        # транзакции. Если построение прервётся, останется INVALID-индекс -
+        # его нужно удалить вручную перед повтором
+        with op.get_context().autocommit_block():
+            for name, table, columns in NEW_INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+            for name, table, _ in REPLACED_INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        return
+
+    for name, table, _ in REPLACED_INDEXES:
+        op.drop_index(name, table_name=table)
+    for name, table, columns in KEYSET_INDEXES:
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, _sqlite_columns(columns))
+    for name, table, columns in NEW_INDEXES:
+        op.create_index(name, table, _sqlite_columns(columns))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in REPLACED_INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+            for name, table, _ in NEW_INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        return
+
+    for name, table, _ in NEW_INDEXES:
+        op.drop_index(name, table_name=table)
+    for name, table, columns in KEYSET_INDEXES:
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns)
+    for name, table, columns in REPLACED_INDEXES:
+        op.create_index(name, table, columns)
@@ -0,0 +1,43 @@
+"""project search vector
+
+Revision ID: 5c81d0e2b7a4
+Revises: aef6a94beca5
+Create Date: 2026-10-18 13:10:42.631580
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c81d0e2b7a4'
+down_revision: Union[str, Sequence[str], None] = 'aef6a94beca5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# конфигурация на момент ревизии (SEARCH_CONFIG в app/db/models.py)
+SEARCH_CONFIG = 'simple'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "ALTER TABLE projects ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(project_name, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')) STORED"
+    )
+    op.create_index('ix_projects_search_vector', 'projects', ['search_vector'],
+                    postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_projects_search_vector', table_name='projects')
+    op.drop_column('projects', 'search_vector')
@@ -0,0 +1,95 @@
+"""analytics materialized views
+
+Revision ID: 8b1e5d3a7c40
+Revises: e7a2c9d41f03
+Create Date: 2026-10-18 21:05:12.418530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e5d3a7c40'
+down_revision: Union[str, Sequence[str], None] = 'e7a2c9d41f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Определения витрин зафиксированы здесь, а не берутся из app/db/analytics.py:
+# ревизия должна создавать то же самое при любой версии кода приложения.
+# В PostgreSQL представления заполняются при создании (полный проход по
+# projects и offers), в SQLite создаются пустые таблицы - их заполнит первое
+# обновление
+AGGREGATES = """count(projects.id) AS project_count,
+    count(projects.id) FILTER (WHERE projects.status = 'open') AS open_project_count,
+    CAST(avg(projects.budget) AS FLOAT) AS budget_avg,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY projects.budget) AS budget_p50,
+    percentile_cont(0.9) WITHIN GROUP (ORDER BY projects.budget) AS budget_p90,
+    coalesce(sum(first_offers.offer_count), 0) AS offer_count,
+    CAST(coalesce(sum(first_offers.offer_count), 0) AS FLOAT)
+        / nullif(count(projects.id), 0) AS offers_per_project,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(epoch FROM
+        first_offers.first_offer_at - projects.created_at)) AS first_offer_p50_seconds,
+    timezone('UTC', now()) AS refreshed_at"""
+FIRST_OFFERS = """LEFT OUTER JOIN (
+    SELECT offers.project_id AS project_id, count(*) AS offer_count,
+           min(offers.created_at) AS first_offer_at
+    FROM offers GROUP BY offers.project_id
+) AS first_offers ON first_offers.project_id = projects.id"""
+
+VIEWS = {
+    'category_stats_mv': ('category_id', f"""
+SELECT categories.id AS category_id, categories.category_name,
+    {AGGREGATES}
+FROM categories
+LEFT OUTER JOIN projects ON projects.category_id = categories.id
+{FIRST_OFFERS}
+GROUP BY categories.id, categories.category_name"""),
+    'marketplace_stats_mv': ('id', f"""
+SELECT 1 AS id,
+    {AGGREGATES}
+FROM projects
+{FIRST_OFFERS}"""),
+}
+
+
+def _stat_columns():
+    return [sa.Column('project_count', sa.Integer()),
+            sa.Column('open_project_count', sa.Integer()),
+            sa.Column('budget_avg', sa.Float()),
+            sa.Column('budget_p50', sa.Float()),
+            sa.Column('budget_p90', sa.Float()),
+            sa.Column('offer_count', sa.Integer()),
+            sa.Column('offers_per_project', sa.Float()),
+            sa.Column('first_offer_p50_seconds', sa.Float()),
+            sa.Column('refreshed_at', sa.DateTime())]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        for name, (key, query) in VIEWS.items():
+            op.execute(f'CREATE MATERIALIZED VIEW {name} AS {query}')
+            # уникальный индекс нужен REFRESH ... CONCURRENTLY
+            op.execute(f'CREATE UNIQUE INDEX ix_{name}_{key} ON {name} ({key})')
+        return
+    op.create_table('category_stats_mv',
+                    sa.Column('category_id', sa.Integer(), primary_key=True),
+                    sa.Column('category_name', sa.String(255)),
+                    *_stat_columns())
+    op.create_table('marketplace_stats_mv',
+                    sa.Column('id', sa.Integer(), primary_key=True),
+                    *_stat_columns())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    for name in VIEWS:
+        if postgresql:
+            op.execute(f'DROP MATERIALIZED VIEW {name}')
+        else:
+            op.drop_table(name)
@@ -0,0 +1,55 @@
+"""on delete cascade
+
+Revision ID: 9d4e6b1f2a37
+Revises: 142a9f771ff6
+Create Date: 2026-10-18 15:21:40.117384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4e6b1f2a37'
+down_revision: Union[str, Sequence[str], None] = '142a9f771ff6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (таблица, колонка, родитель); имена ограничений - по умолчанию PostgreSQL
+FOREIGN_KEYS = [
+    ('skill_project', 'project_id', 'projects'),
+    ('skill_project', 'skill_id', 'skills'),
+    ('userprofiles', 'skill_id', 'skills'),
+    ('projects', 'category_id', 'categories'),
+    ('projects', 'client_id', 'userprofiles'),
+    ('offers', 'project_id', 'projects'),
+    ('offers', 'freelancer_id', 'userprofiles'),
+    ('reviews', 'project_id', 'projects'),
+    ('reviews', 'reviewer_id', 'userprofiles'),
+    ('reviews', 'target_id', 'userprofiles'),
+    ('user_rating_stats', 'user_id', 'userprofiles'),
+]
+
+
+def _recreate(ondelete) -> None:
+    # SQLite не умеет менять внешние ключи без пересоздания таблиц;
+    # локальные SQLite-базы проще создать заново
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column, parent in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, parent, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _recreate('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _recreate(None)
@@ -0,0 +1,40 @@
+"""pagination indexes
+
+Revision ID: aef6a94beca5
+Revises: 16a03b60efbd
+Create Date: 2026-10-18 13:02:11.412095
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aef6a94beca5'
+down_revision: Union[str, Sequence[str], None] = '16a03b60efbd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_userprofiles_created_at_id', 'userprofiles', ['created_at', 'id'])
+    op.create_index('ix_projects_created_at_id', 'projects', ['created_at', 'id'])
+    op.create_index('ix_offers_created_at_id', 'offers', ['created_at', 'id'])
+    op.create_index('ix_reviews_created_at_id', 'reviews', ['created_at', 'id'])
+    op.create_index(op.f('ix_projects_status'), 'projects', ['status'])
+    op.create_index(op.f('ix_projects_budget'), 'projects', ['budget'])
+    op.create_index(op.f('ix_projects_deadline'), 'projects', ['deadline'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_projects_deadline'), table_name='projects')
+    op.drop_index(op.f('ix_projects_budget'), table_name='projects')
+    op.drop_index(op.f('ix_projects_status'), table_name='projects')
+    op.drop_index('ix_reviews_created_at_id', table_name='reviews')
+    op.drop_index('ix_offers_created_at_id', table_name='offers')
+    op.drop_index('ix_projects_created_at_id', table_name='projects')
+    op.drop_index('ix_userprofiles_created_at_id', table_name='userprofiles')
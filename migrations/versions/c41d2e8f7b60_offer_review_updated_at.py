@@ -0,0 +1,38 @@
+"""offer and review updated_at
+
+Revision ID: c41d2e8f7b60
+Revises: 3b7f0c5e9a12
+Create Date: 2026-10-18 16:48:03.227415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d2e8f7b60'
+down_revision: Union[str, Sequence[str], None] = '3b7f0c5e9a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('offers', 'reviews'):
+        if op.get_bind().dialect.name == 'postgresql':
+            # now() стабильна в транзакции - PostgreSQL 11+ добавляет колонку
+            # без перезаписи таблицы
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(),
+                                           server_default=sa.func.now(), nullable=False))
+        else:
+            # SQLite не добавляет колонку с непостоянным DEFAULT
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+            op.execute(f'UPDATE {table} SET updated_at = created_at')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('reviews', 'updated_at')
+    op.drop_column('offers', 'updated_at')
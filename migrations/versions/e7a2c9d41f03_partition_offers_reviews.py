@@ -0,0 +1,141 @@
+"""partition offers and reviews by created_at
+
+Revision ID: e7a2c9d41f03
+Revises: c41d2e8f7b60
+Create Date: 2026-10-18 17:32:40.681203
+
+"""
+from datetime import date, datetime
+from typing import List, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c9d41f03'
+down_revision: Union[str, Sequence[str], None] = 'c41d2e8f7b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Схема секций описана в app/db/partitions.py; имена и границы секций
+# зафиксированы здесь, чтобы ревизия не зависела от версии кода и окружения.
+# Горизонт - фиксированные MONTHS_AHEAD месяцев: дальше секции создаёт
+# ensure_partitions при старте приложения и по cron. Таблицы пересоздаются с
+# копированием всех строк под ACCESS EXCLUSIVE: на больших базах - в окно
+# обслуживания. Ключ секционирования обязан входить в первичный ключ,
+# поэтому PK становится составным; id по-прежнему выдаёт прежняя последовательность
+TABLES = {
+    'offers': dict(
+        partition_by='LIST (archived)',
+        subpartitions=[('offers_hot', '(false)'), ('offers_archive', '(true)')],
+        primary_key=['id', 'archived', 'created_at'],
+        foreign_keys=[('project_id', 'projects'), ('freelancer_id', 'userprofiles')],
+        indexes=[('ix_offers_created_at_id', ['created_at', 'id']),
+                 ('ix_offers_project_created_at_id', ['project_id', 'created_at', 'id']),
+                 ('ix_offers_freelancer_created_at_id', ['freelancer_id', 'created_at', 'id'])]),
+    'reviews': dict(
+        partition_by='RANGE (created_at)',
+        subpartitions=[],
+        primary_key=['id', 'created_at'],
+        foreign_keys=[('project_id', 'projects'), ('reviewer_id', 'userprofiles'),
+                      ('target_id', 'userprofiles')],
+        indexes=[('ix_reviews_created_at_id', ['created_at', 'id']),
+                 ('ix_reviews_target_created_at_id', ['target_id', 'created_at', 'id']),
+                 ('ix_reviews_project_id', ['project_id']),
+                 ('ix_reviews_reviewer_id', ['reviewer_id'])]),
+}
+
+
+MONTHS_AHEAD = 3
+MONTHLY_PARENTS = (('offers_hot', 'offers'), ('reviews', 'reviews'))
+ARCHIVE_PARENT = 'offers_archive'
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition(name: str, parent: str, start: date, end: date) -> str:
+    return (f"CREATE TABLE {name} PARTITION OF {parent} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')")
+
+
+def _partitions(first: date, last: date, now: date) -> List[str]:
+    # помесячные секции с first по last включительно и годовые архивные
+    ddl = []
+    month = month_start(first)
+    while month <= last:
+        for parent, prefix in MONTHLY_PARENTS:
+            ddl.append(_partition(f'{prefix}_p{month:%Y%m}', parent, month, add_months(month, 1)))
+        month = add_months(month, 1)
+    for year in range(now.year, last.year + 1):
+        ddl.append(_partition(f'{ARCHIVE_PARENT}_y{year}', ARCHIVE_PARENT,
+                              date(year, 1, 1), date(year + 1, 1, 1)))
+    return ddl
+
+
+def _create(table: str, partition_by: str = None, subpartitions=()) -> None:
+    # прежняя таблица уже переименована в <table>_old; LIKE переносит колонки,
+    # NOT NULL, DEFAULT (в том числе nextval последовательности id) и CHECK
+    partition = f' PARTITION BY {partition_by}' if partition_by else ''
+    op.execute(f'CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS '
+               f'INCLUDING CONSTRAINTS){partition}')
+    for name, values in subpartitions:
+        op.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES IN {values} '
+                   f'PARTITION BY RANGE (created_at)')
+
+
+def _fill(table: str, primary_key, foreign_keys, indexes) -> None:
+    # индексы и ключи строятся после копирования - так быстрее
+    op.execute(f'INSERT INTO {table} SELECT * FROM {table}_old')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    op.execute(f'DROP TABLE {table}_old')
+    op.create_primary_key(f'{table}_pkey', table, primary_key)
+    for column, parent in foreign_keys:
+        op.create_foreign_key(f'{table}_{column}_fkey', table, parent, [column], ['id'],
+                              ondelete='CASCADE')
+    for name, columns in indexes:
+        op.create_index(name, table, columns)
+    op.execute(f'ANALYZE {table}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('offers', sa.Column('archived', sa.Boolean(), server_default=sa.false(),
+                                      nullable=False))
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    first, newest = bind.execute(sa.text(
+        'SELECT min(created_at), max(created_at) FROM '
+        '(SELECT created_at FROM offers UNION ALL SELECT created_at FROM reviews) AS created'
+    )).one()
+    now = month_start(datetime.utcnow())
+    last = max(add_months(now, MONTHS_AHEAD), month_start(newest or now))
+    for table, layout in TABLES.items():
+        op.rename_table(table, f'{table}_old')
+        _create(table, layout['partition_by'], layout['subpartitions'])
+    # секции с месяца самой старой строки и на MONTHS_AHEAD месяцев вперёд
+    for ddl in _partitions(first or now, last, now):
+        op.execute(ddl)
+    for table, layout in TABLES.items():
+        _fill(table, layout['primary_key'], layout['foreign_keys'], layout['indexes'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, layout in TABLES.items():
+            # секции удаляются вместе с родительской таблицей
+            op.rename_table(table, f'{table}_old')
+            _create(table)
+            _fill(table, ['id'], layout['foreign_keys'], layout['indexes'])
+    op.drop_column('offers', 'archived')
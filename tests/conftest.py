@@ -0,0 +1,37 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# До первого импорта app: engine создаётся при импорте app.db.database.
+# Тесты всегда работают с отдельным файлом SQLite, а не с DATABASE_URL
+# окружения - bench.seed пересоздаёт схему
+_db_dir = tempfile.mkdtemp(prefix='freelance-tests-')
+os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'tests.db')}"
+
+
+async def _reset_database() -> None:
+    from app.db.database import engine
+    from app.db.models import Base
+    from app.services.cache import catalog_cache
+    from app.services.ranking import freelancer_index
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+    # кеш справочников и индекс фрилансеров живут в процессе между тестами
+    await catalog_cache.invalidate('')
+    freelancer_index.load(())
+    freelancer_index.built_at = None
+
+
+@pytest.fixture
+def client():
+    from starlette.testclient import TestClient
+    from app.main import freelance
+
+    asyncio.run(_reset_database())
+    with TestClient(freelance) as test_client:
+        yield test_client
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+
+from app.config import ADMISSION_RETRY_AFTER
+from app.middlewares.admission import AdmissionMiddleware
+from app.services.admission import LIST, READ, WRITE, AdmissionControl, MemoryBuckets
+
+
+def _app(release: asyncio.Event = None):
+    async def app(scope, receive, send) -> None:
+        if release is not None:
+            await release.wait()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'ok'})
+    return app
+
+
+def _client(app, host: str = '10.0.0.1') -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, client=(host, 40000)),
+                             base_url='http://test')
+
+
+def test_rate_limit_answers_429_with_retry_after():
+    async def run() -> list:
+        control = AdmissionControl(MemoryBuckets(rate=0.5, burst=2, max_clients=100))
+        app = AdmissionMiddleware(_app(), control)
+        async with _client(app) as client, _client(app, '10.0.0.2') as other:
+            responses = [await client.get('/project/17') for _ in range(3)]
+            # бакет у каждого клиента свой, служебные пути не ограничиваются
+            responses += [await other.get('/project/17'), await client.get('/health/ready')]
+        assert control.rejected['rate_limit'] == 1
+        return responses
+
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200, 200, 429, 200, 200]
+    # токен восстанавливается за 2 секунды
+    assert responses[2].headers['retry-after'] == '2'
+    assert responses[2].json() == {'detail': 'Too many requests'}
+
+
+def test_concurrency_cap_answers_503():
+    async def run():
+        release = asyncio.Event()
+        control = AdmissionControl(limits={LIST: 1, READ: 0, WRITE: 0})
+        app = AdmissionMiddleware(_app(release), control)
+        async with _client(app) as client:
+            first = asyncio.create_task(client.get('/project/'))
+            while control.in_flight[LIST] == 0:
+                await asyncio.sleep(0)
+            busy = await client.get('/offers/')
+            # лимит только у списков: карточка проходит
+            release.set()
+            read = await client.get('/project/17')
+            return await first, busy, read, control
+
+    first, busy, read, control = asyncio.run(run())
+    assert (first.status_code, busy.status_code, read.status_code) == (200, 503, 200)
+    assert busy.headers['retry-after'] == str(max(1, ADMISSION_RETRY_AFTER))
+    assert control.in_flight == {READ: 0, LIST: 0, WRITE: 0}
+    assert control.rejected == {'rate_limit': 0, READ: 0, LIST: 1, WRITE: 0}
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+
+
+DEADLINE = '2030-01-01T00:00:00'
+
+
+def _catalog(client):
+    category = client.post('/category/', json={'category_name': 'web'}).json()['id']
+    user = client.post('/user/', json={'first_name': 'A', 'last_name': 'B', 'user_name': 'client',
+                                       'email': 'client@example.com', 'role': 'client',
+                                       'password': 'secret1'}).json()['id']
+    return category, user
+
+
+def _project(category, user, **fields):
+    return {'project_name': 'P', 'category_id': category, 'client_id': user, 'status': 'open',
+            'deadline': DEADLINE, **fields}
+
+
+def _errors(result) -> dict:
+    return {error['index']: error['errors'] for error in result['errors']}
+
+
+def test_bulk_create_mixed_batch(client):
+    category, user = _catalog(client)
+    response = client.post('/project/bulk', json=[
+        _project(category, user, project_name='first'),
+        _project(category, user, status='unknown'),
+        {'project_name': 'no category'},
+        _project(category, user, project_name='last'),
+    ])
+    assert response.status_code == 200
+    result = response.json()
+    assert [item['index'] for item in result['created']] == [0, 3]
+    assert sorted(_errors(result)) == [1, 2]
+    assert {error['loc'][0] for error in _errors(result)[2]} >= {'category_id', 'status'}
+    names = {client.get(f"/project/{item['id']}").json()['project_name']
+             for item in result['created']}
+    assert names == {'first', 'last'}
+
+
+def test_bulk_create_missing_foreign_key(client):
+    category, user = _catalog(client)
+    result = client.post('/project/bulk', json=[
+        _project(category, user),
+        _project(category + 100, user),
+        _project(category, user + 100),
+    ]).json()
+    assert [item['index'] for item in result['created']] == [0]
+    errors = _errors(result)
+    assert errors[1] == [{'loc': ['category_id'], 'type': 'foreign_key',
+                          'msg': f'category_id {category + 100} does not exist'}]
+    assert errors[2][0]['loc'] == ['client_id'] and errors[2][0]['type'] == 'foreign_key'
+
+
+def test_bulk_create_missing_not_null_field(client):
+    # deadline в схеме необязателен, а в таблице NOT NULL
+    category, user = _catalog(client)
+    project = _project(category, user)
+    del project['deadline']
+    result = client.post('/project/bulk', json=[_project(category, user), project]).json()
+    assert [item['index'] for item in result['created']] == [0]
+    assert _errors(result)[1] == [{'loc': ['deadline'], 'msg': 'deadline may not be null',
+                                   'type': 'not_null'}]
+
+
+def test_bulk_create_constraint_failure_is_per_item(client):
+    # ограничение, о котором схема запроса не знает: падает сам INSERT пачки
+    path = os.environ['DATABASE_URL'].split(':///', 1)[1]
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE UNIQUE INDEX ux_skills_skill_name ON skills (skill_name)')
+    result = client.post('/skill/bulk', json=[{'skill_name': 'python'}, {'skill_name': 'python'},
+                                              {'skill_name': 'go'}]).json()
+    assert len(result['created']) == 2
+    assert [error['type'] for errors in _errors(result).values() for error in errors] \
+        == ['integrity_error']
+
+
+def test_bulk_status_reports_unknown_ids(client):
+    category, user = _catalog(client)
+    created = client.post('/project/bulk', json=[_project(category, user)] * 3).json()['created']
+    ids = [item['id'] for item in created]
+    response = client.patch('/project/bulk/status',
+                            json={'ids': [*ids, 9999], 'status': 'completed'})
+    assert response.status_code == 200
+    assert response.json() == {'updated': sorted(ids), 'not_found': [9999]}
+    assert {client.get(f'/project/{id_}').json()['status'] for id_ in ids} == {'completed'}
+
+
+def test_bulk_status_rejects_invalid_status(client):
+    category, user = _catalog(client)
+    project = client.post('/project/bulk', json=[_project(category, user)]).json()['created'][0]
+    response = client.patch('/project/bulk/status',
+                            json={'ids': [project['id']], 'status': 'unknown'})
+    assert response.status_code == 422
+    assert client.get(f"/project/{project['id']}").json()['status'] == 'open'
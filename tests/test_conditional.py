@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from starlette.requests import Request
+
+from app.db.conditional import Validators
+
+
+# PostgreSQL хранит микросекунды, в заголовке - только целые секунды
+MODIFIED = datetime(2026, 10, 18, 12, 0, 0, 512345)
+
+
+def _request(**headers) -> Request:
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'',
+                    'headers': [(name.replace('_', '-').encode(), value.encode())
+                                for name, value in headers.items()]})
+
+
+def test_own_last_modified_gives_304():
+    validators = Validators.from_state(1, last_modified=MODIFIED)
+    last_modified = validators.headers()['Last-Modified']
+    assert validators.matches(_request(if_modified_since=last_modified))
+    assert validators.not_modified().status_code == 304
+
+
+def test_later_change_is_not_matched():
+    sent = Validators.from_state(1, last_modified=MODIFIED).headers()['Last-Modified']
+    changed = Validators.from_state(2, last_modified=MODIFIED + timedelta(seconds=1))
+    assert not changed.matches(_request(if_modified_since=sent))
+
+
+def test_if_none_match_takes_precedence():
+    validators = Validators.from_state(1, last_modified=MODIFIED)
+    headers = validators.headers()
+    assert not validators.matches(_request(if_none_match='W/"other"',
+                                           if_modified_since=headers['Last-Modified']))
+    assert validators.matches(_request(if_none_match=headers['ETag']))
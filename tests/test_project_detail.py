@@ -0,0 +1,36 @@
+from app.db.loaders import PROJECT_DETAIL_OFFERS
+
+
+DEADLINE = '2030-01-01T00:00:00'
+
+
+def _create(client, url: str, **fields) -> int:
+    response = client.post(url, json=fields)
+    assert response.status_code == 200, response.text
+    return response.json()['id']
+
+
+def test_project_detail_embeds_newest_offers_only(client):
+    category = _create(client, '/category/', category_name='web')
+    owner = _create(client, '/user/', first_name='A', last_name='B', user_name='client',
+                    email='client@example.com', role='client', password='secret1')
+    freelancer = _create(client, '/user/', first_name='A', last_name='B', user_name='freelancer',
+                         email='freelancer@example.com', role='freelancer', password='secret1')
+    project = _create(client, '/project/', project_name='P', category_id=category,
+                      client_id=owner, status='open', deadline=DEADLINE)
+    total = PROJECT_DETAIL_OFFERS + 5
+    created = client.post('/offers/bulk', json=[
+        {'message': 'hello there', 'proposed_budget': str(10 + i), 'proposed_deadline': DEADLINE,
+         'project_id': project, 'freelancer_id': freelancer} for i in range(total)]).json()
+    assert len(created['created']) == total
+
+    detail = client.get(f'/project/{project}').json()
+    first_page = client.get(f'/project/{project}/offers',
+                            params={'limit': PROJECT_DETAIL_OFFERS}).json()
+    assert [offer['id'] for offer in detail['offers']] \
+        == [offer['id'] for offer in first_page['items']]
+    assert first_page['next_cursor'] is not None
+    # агрегаты - по всем предложениям проекта, а не по вложенной странице
+    assert detail['offer_count'] == total
+    assert float(detail['min_proposed_budget']) == 10
+    assert float(detail['median_proposed_budget']) == 10 + (total - 1) / 2
@@ -0,0 +1,33 @@
+import asyncio
+
+from bench.plans import explain, list_queries
+from bench.seed import Plan, seed_database
+
+
+# Немного строк, чтобы планировщик SQLite видел таблицы со статистикой;
+# на PostgreSQL проверку запускает python -m bench.plans
+PLAN = Plan(users=200, skills=10, categories=5, projects=500, offers=1000, reviews=300,
+            skew=3.0, seed=1)
+
+
+async def _bad_plans() -> dict:
+    from app.db.database import async_session_maker, engine
+
+    try:
+        await seed_database(engine, PLAN, reset=True)
+        failures = {}
+        async with async_session_maker() as db:
+            for name, _, _, stmt in list_queries(db):
+                lines, bad, _ = await explain(db, stmt)
+                await db.rollback()
+                if bad:
+                    failures[name] = bad
+        return failures
+    finally:
+        await engine.dispose()
+
+
+def test_list_queries_use_indexes():
+    # последовательное чтение или сортировка во временном B-дереве значат,
+    # что запросу списка не хватает индекса (app/db/models.py, keyset_index)
+    assert asyncio.run(_bad_plans()) == {}
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+
+from app.services import purge
+
+
+DEADLINE = '2030-01-01T00:00:00'
+
+
+def _mismatches(client) -> int:
+    # в цикле событий приложения: соединения движка привязаны к нему
+    from app.db.database import async_session_maker
+    from app.services.ratings import reconcile
+
+    async def check() -> int:
+        async with async_session_maker() as db:
+            return await reconcile(db, check_only=True)
+
+    return client.portal.call(check)
+
+
+def _create(client, url: str, **fields) -> int:
+    response = client.post(url, json=fields)
+    assert response.status_code == 200, response.text
+    return response.json()['id']
+
+
+def _user(client, name: str, role: str) -> int:
+    return _create(client, '/user/', first_name='A', last_name='B', user_name=name,
+                   email=f'{name}@example.com', role=role, password='secret1')
+
+
+def test_rating_stats_follow_review_writes(client, monkeypatch):
+    # пачки по 2 строки: purge_user проходит несколько транзакций
+    monkeypatch.setattr(purge, 'PURGE_BATCH_SIZE', 2)
+    skill = _create(client, '/skill/', skill_name='go')
+    category = _create(client, '/category/', category_name='web')
+    clients = [_user(client, f'client{i}', 'client') for i in range(2)]
+    freelancers = [_user(client, f'freelancer{i}', 'freelancer') for i in range(3)]
+    projects = [_create(client, '/project/', project_name=f'P{i}', category_id=category,
+                        client_id=clients[i % 2], status='open', deadline=DEADLINE)
+                for i in range(4)]
+    reviews = []
+    for i, project in enumerate(projects):
+        for freelancer in freelancers:
+            reviews.append(_create(client, '/reviews/', rating=1 + (i + freelancer) % 5,
+                                   comment='okay fine', project_id=project,
+                                   reviewer_id=clients[i % 2], target_id=freelancer))
+        _create(client, '/reviews/', rating=3, comment='okay fine', project_id=project,
+                reviewer_id=freelancers[0], target_id=clients[1])
+    assert client.get(f'/user/{freelancers[1]}').json()['review_count'] == len(projects)
+    assert _mismatches(client) == 0
+
+    assert client.put(f'/reviews/{reviews[0]}', json={'rating': 5}).status_code == 200
+    assert _mismatches(client) == 0
+    assert client.delete(f'/reviews/{reviews[1]}').status_code == 200
+    assert _mismatches(client) == 0
+
+    # фоновое удаление пачками: отзывы клиента и отзывы на его проектах
+    assert client.delete(f'/user/{clients[0]}?background=true').status_code == 202
+    assert client.get(f'/user/{clients[0]}').status_code == 404
+    assert _mismatches(client) == 0
+
+    # каскад удаления навыка забирает его пользователей вместе с их отзывами
+    path = os.environ['DATABASE_URL'].split(':///', 1)[1]
+    with sqlite3.connect(path) as conn:
+        conn.execute('UPDATE userprofiles SET skill_id = ? WHERE id = ?', (skill, freelancers[0]))
+    assert client.delete(f'/skill/{skill}').status_code == 200
+    assert client.get(f'/user/{freelancers[0]}').status_code == 404
+    assert client.get(f'/user/{clients[1]}').json()['review_count'] == 0
+    assert _mismatches(client) == 0